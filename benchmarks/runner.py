@@ -0,0 +1,345 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Benchmark cases, timing and comparison of runs"""
+
+import argparse
+import functools
+import json
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import qiskit
+
+import mapomatic as mm
+
+from . import synthetic
+
+# Keep the VF2 search and the number of scored layouts bounded so that the
+# cases on the largest devices finish in seconds
+CALL_LIMIT = int(1e5)
+MAX_LAYOUTS = 200
+QUICK_MAX_QUBITS = 200
+
+
+@functools.lru_cache(maxsize=None)
+def backends():
+    """Benchmark devices keyed by name, smallest first"""
+    devices = [
+        synthetic.line_backend(5),
+        synthetic.heavy_hex_backend(3),
+        synthetic.heavy_hex_backend(7),
+        synthetic.heavy_hex_backend(21),
+    ]
+    try:
+        from qiskit_ibm_runtime.fake_provider import FakeBelemV2, FakeMontrealV2
+    except ImportError:
+        pass
+    else:
+        devices.extend([FakeBelemV2(), FakeMontrealV2()])
+    devices.sort(key=lambda backend: backend.configuration().num_qubits)
+    return {backend.configuration().backend_name: backend for backend in devices}
+
+
+@functools.lru_cache(maxsize=None)
+def circuits():
+    """Benchmark circuits of varying width, depth and interaction structure"""
+    return {
+        "star4": synthetic.star_circuit(3),
+        "line8x4": synthetic.line_circuit(8, depth=4),
+        "layered12x10": synthetic.layered_circuit(12, depth=10),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def layouts(backend_name, circuit_name):
+    """Matching layouts used by the scoring cases"""
+    backend = backends()[backend_name]
+    return mm.matching_layouts(
+        circuits()[circuit_name],
+        backend.configuration().coupling_map,
+        call_limit=CALL_LIMIT,
+    )[:MAX_LAYOUTS]
+
+
+def cases():
+    """Benchmark cases.
+
+    Returns:
+        list: Tuples of case name, device size and a setup function that
+        returns the callable to time.
+    """
+    out = [
+        ("import[mapomatic]", 0, _import("import mapomatic")),
+        (
+            "import[best_overall_layout]",
+            0,
+            _import("from mapomatic import best_overall_layout"),
+        ),
+    ]
+    for backend_name, backend in backends().items():
+        num_qubits = backend.configuration().num_qubits
+        for circuit_name, circ in circuits().items():
+            if circ.num_qubits > num_qubits:
+                continue
+            tag = "[{}-{}]".format(backend_name, circuit_name)
+            out.append(("matching_layouts" + tag, num_qubits, _matching(circ, backend)))
+            out.append(
+                (
+                    "evaluate_layouts" + tag,
+                    num_qubits,
+                    _evaluate(circ, backend_name, circuit_name),
+                )
+            )
+            out.append(("inflate_circuit" + tag, num_qubits, _inflate(circ, backend)))
+            out.append(("deflate_circuit" + tag, num_qubits, _deflate(circ, backend)))
+        out.append(
+            (
+                "deflate_circuit[{}-full_width_x10]".format(backend_name),
+                num_qubits,
+                _deflate_full_width(num_qubits),
+            )
+        )
+    # Every matching layout is scored here, so the widest circuit is left out
+    for circuit_name in ["star4", "line8x4"]:
+        circ = circuits()[circuit_name]
+        for limit in [QUICK_MAX_QUBITS, None]:
+            fleet = [
+                backend
+                for backend in backends().values()
+                if limit is None or backend.configuration().num_qubits <= limit
+            ]
+            size = max(backend.configuration().num_qubits for backend in fleet)
+            name = "best_overall_layout[{}x{}-{}]".format(
+                len(fleet), size, circuit_name
+            )
+            out.append((name, size, _best_overall(circ, fleet)))
+    return out
+
+
+def _import(statement):
+    # Cold start of a fresh interpreter, as for a short-lived worker process
+    def setup():
+        return lambda: subprocess.run([sys.executable, "-c", statement], check=True)
+
+    return setup
+
+
+def _matching(circ, backend):
+    def setup():
+        cmap = backend.configuration().coupling_map
+        return lambda: mm.matching_layouts(circ, cmap, call_limit=CALL_LIMIT)
+
+    return setup
+
+
+def _evaluate(circ, backend_name, circuit_name):
+    def setup():
+        found = layouts(backend_name, circuit_name)
+        backend = backends()[backend_name]
+        return lambda: mm.evaluate_layouts(circ, found, backend)
+
+    return setup
+
+
+def _inflate(circ, backend):
+    def setup():
+        layout = list(range(circ.num_qubits))
+        num_qubits = backend.configuration().num_qubits
+        return lambda: mm.inflate_circuit(circ, layout, num_qubits)
+
+    return setup
+
+
+def _deflate(circ, backend):
+    def setup():
+        num_qubits = backend.configuration().num_qubits
+        wide = mm.inflate_circuit(circ, list(range(circ.num_qubits)), num_qubits)
+        return lambda: mm.deflate_circuit(wide)
+
+    return setup
+
+
+def _deflate_full_width(num_qubits):
+    def setup():
+        wide = synthetic.layered_circuit(num_qubits, depth=10)
+        return lambda: mm.deflate_circuit(wide)
+
+    return setup
+
+
+def _best_overall(circ, fleet):
+    def setup():
+        return lambda: mm.best_overall_layout(circ, fleet, call_limit=CALL_LIMIT)
+
+    return setup
+
+
+def measure(func, repeat):
+    """Time a callable and record its peak traced memory.
+
+    Parameters:
+        func (callable): Function to benchmark
+        repeat (int): Number of timed runs
+
+    Returns:
+        dict: Minimum and median run time in sec and peak memory in bytes
+    """
+    # Fast functions are warmed up and batched so each timed run lasts ~50 ms
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    number = min(max(int(0.05 / max(first, 1e-9)), 1), 1000)
+    times = [first] if number == 1 else []
+    while len(times) < repeat:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    # Tracing slows execution down, so memory is measured in a separate run
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"min": min(times), "median": statistics.median(times), "peak_bytes": peak}
+
+
+def run(pattern=None, repeat=3, quick=False, verbose=True):
+    """Run the benchmark cases.
+
+    Parameters:
+        pattern (str): Only run cases whose name matches this regex
+        repeat (int): Number of timed runs per case
+        quick (bool): Skip devices larger than ``QUICK_MAX_QUBITS``
+        verbose (bool): Print each result as it completes
+
+    Returns:
+        dict: Environment information and results keyed by case name
+    """
+    results = {}
+    for name, size, setup in cases():
+        if quick and size > QUICK_MAX_QUBITS:
+            continue
+        if pattern and not re.search(pattern, name):
+            continue
+        results[name] = measure(setup(), repeat)
+        if verbose:
+            print(_format_result(name, results[name]), flush=True)
+    return {
+        "environment": {
+            "mapomatic": mm.__version__,
+            "qiskit": qiskit.__version__,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=1.2):
+    """Compare two benchmark runs.
+
+    Parameters:
+        baseline (dict): Output of ``run`` for the reference
+        current (dict): Output of ``run`` to check
+        threshold (float): Time or memory ratio above which a case regressed
+
+    Returns:
+        tuple: Report lines and list of regressed case names
+    """
+    lines = [
+        "{:<60} {:>10} {:>10} {:>8} {:>8}".format(
+            "case", "base (s)", "new (s)", "time", "memory"
+        )
+    ]
+    regressed = []
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        time_ratio = new["min"] / old["min"] if old["min"] else float("inf")
+        mem_ratio = new["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] else 1
+        flag = ""
+        if time_ratio > threshold or mem_ratio > threshold:
+            regressed.append(name)
+            flag = "  <-- regression"
+        lines.append(
+            "{:<60} {:>10.5f} {:>10.5f} {:>7.2f}x {:>7.2f}x{}".format(
+                name, old["min"], new["min"], time_ratio, mem_ratio, flag
+            )
+        )
+    return lines, regressed
+
+
+def _format_result(name, result):
+    return "{:<60} {:>10.5f} s {:>10.5f} s {:>10.1f} KiB".format(
+        name, result["min"], result["median"], result["peak_bytes"] / 1024
+    )
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Mapomatic performance benchmarks"
+    )
+    parser.add_argument("-k", "--filter", help="only run cases matching this regex")
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3, help="timed runs per case"
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="skip devices with more than {} qubits".format(QUICK_MAX_QUBITS),
+    )
+    parser.add_argument("-o", "--output", help="write results to this JSON file")
+    parser.add_argument(
+        "--compare", help="JSON file of a previous run to compare against"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="slowdown or memory growth ratio reported as a regression",
+    )
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, size, _ in cases():
+            if not (args.quick and size > QUICK_MAX_QUBITS):
+                if not args.filter or re.search(args.filter, name):
+                    print(name)
+        return 0
+
+    print("{:<60} {:>12} {:>12} {:>14}".format("case", "min", "median", "peak memory"))
+    current = run(args.filter, args.repeat, args.quick)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out_file:
+            json.dump(current, out_file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as in_file:
+            baseline = json.load(in_file)
+        lines, regressed = compare(baseline, current, args.threshold)
+        print()
+        print("\n".join(lines))
+        if regressed:
+            print("\n{} case(s) regressed".format(len(regressed)))
+            return 1
+    return 0
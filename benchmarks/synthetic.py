@@ -0,0 +1,170 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Synthetic backends and circuits for benchmarking"""
+
+import datetime
+import types
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.transpiler import CouplingMap
+from qiskit_ibm_runtime.models import BackendProperties
+
+BASIS_GATES = ["id", "rz", "sx", "x", "cx", "reset"]
+
+
+class SyntheticBackend:
+    """Backend stand-in with random calibration data on a given coupling map.
+
+    Provides the ``configuration()`` and ``properties()`` interface used by
+    mapomatic, so that devices of any size can be benchmarked offline.
+
+    Parameters:
+        name (str): Backend name
+        coupling_map (CouplingMap): Device topology
+        seed (int): Seed for the calibration data
+    """
+
+    def __init__(self, name, coupling_map, seed=0):
+        self.name = name
+        self.coupling_map = coupling_map
+        self._config = types.SimpleNamespace(
+            backend_name=name,
+            num_qubits=coupling_map.size(),
+            coupling_map=[list(edge) for edge in coupling_map.get_edges()],
+            basis_gates=BASIS_GATES,
+            simulator=False,
+            dt=2.2222222222222221e-10,
+        )
+        self._props = BackendProperties.from_dict(
+            _random_properties(name, coupling_map, np.random.default_rng(seed))
+        )
+
+    def configuration(self):
+        """Backend configuration"""
+        return self._config
+
+    def properties(self):
+        """Backend calibration data"""
+        return self._props
+
+
+def heavy_hex_backend(distance, seed=0):
+    """Synthetic heavy-hex device (19 qubits at distance 3, 1081 at 21)"""
+    cmap = CouplingMap.from_heavy_hex(distance, bidirectional=True)
+    return SyntheticBackend("heavy_hex_{}".format(cmap.size()), cmap, seed=seed)
+
+
+def line_backend(num_qubits, seed=0):
+    """Synthetic linear device"""
+    cmap = CouplingMap.from_line(num_qubits, bidirectional=True)
+    return SyntheticBackend("line_{}".format(num_qubits), cmap, seed=seed)
+
+
+def _random_properties(name, coupling_map, rng):
+    """Properties dictionary with plausible random calibration data"""
+    date = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def param(pname, value, unit=""):
+        return {"date": date, "name": pname, "unit": unit, "value": float(value)}
+
+    qubits = []
+    for _ in range(coupling_map.size()):
+        qubits.append(
+            [
+                param("T1", rng.uniform(50, 300), "us"),
+                param("T2", rng.uniform(50, 300), "us"),
+                param("readout_error", rng.uniform(0.005, 0.05)),
+                param("readout_length", 5000, "ns"),
+            ]
+        )
+    gates = []
+    for qubit in range(coupling_map.size()):
+        error = rng.uniform(1e-4, 1e-3)
+        for gate in ["id", "sx", "x"]:
+            gates.append(
+                {
+                    "gate": gate,
+                    "name": "{}{}".format(gate, qubit),
+                    "qubits": [qubit],
+                    "parameters": [
+                        param("gate_error", error),
+                        param("gate_length", 35.5, "ns"),
+                    ],
+                }
+            )
+        gates.append(
+            {
+                "gate": "rz",
+                "name": "rz{}".format(qubit),
+                "qubits": [qubit],
+                "parameters": [param("gate_error", 0), param("gate_length", 0, "ns")],
+            }
+        )
+    for edge in coupling_map.get_edges():
+        gates.append(
+            {
+                "gate": "cx",
+                "name": "cx{}_{}".format(*edge),
+                "qubits": list(edge),
+                "parameters": [
+                    param("gate_error", rng.uniform(3e-3, 3e-2)),
+                    param("gate_length", rng.uniform(250, 600), "ns"),
+                ],
+            }
+        )
+    return {
+        "backend_name": name,
+        "backend_version": "0.0.0",
+        "last_update_date": date,
+        "qubits": qubits,
+        "gates": gates,
+        "general": [],
+    }
+
+
+def line_circuit(num_qubits, depth=1):
+    """Nearest-neighbour CX chain repeated ``depth`` times"""
+    qc = QuantumCircuit(num_qubits)
+    for _ in range(depth):
+        for qubit in range(num_qubits):
+            qc.sx(qubit)
+        for qubit in range(num_qubits - 1):
+            qc.cx(qubit, qubit + 1)
+    qc.measure_all()
+    return qc
+
+
+def star_circuit(num_leaves=3, depth=1):
+    """CX fan-out from a central qubit, embeddable in heavy-hex for 3 leaves"""
+    qc = QuantumCircuit(num_leaves + 1)
+    for _ in range(depth):
+        qc.sx(0)
+        for leaf in range(1, num_leaves + 1):
+            qc.cx(0, leaf)
+    qc.measure_all()
+    return qc
+
+
+def layered_circuit(num_qubits, depth, seed=0):
+    """Random brickwork of single qubit gates and CX on a line"""
+    rng = np.random.default_rng(seed)
+    qc = QuantumCircuit(num_qubits)
+    for layer in range(depth):
+        for qubit in range(num_qubits):
+            qc.rz(rng.uniform(0, 2 * np.pi), qubit)
+            qc.sx(qubit)
+        for qubit in range(layer % 2, num_qubits - 1, 2):
+            qc.cx(qubit, qubit + 1)
+    qc.measure_all()
+    return qc
@@ -12,13 +12,60 @@
 
 """MapMan"""
 
+import importlib
+
 try:
     from .version import version as __version__
 except ImportError:
     __version__ = "0.0.0"
 
-from .circuits import deflate_circuit, inflate_circuit, active_bits
-from .layouts import best_overall_layout, matching_layouts, evaluate_layouts
+# Public names, keyed by the submodule that defines them.  Submodules, and
+# the Qiskit modules they depend on, are imported on first access so that
+# importing mapomatic itself stays fast.
+_LAZY_NAMES = {
+    "circuits": ["deflate_circuit", "inflate_circuit", "active_bits"],
+    "layouts": [
+        "best_overall_layout",
+        "matching_layouts",
+        "iter_matching_layouts",
+        "evaluate_layouts",
+        "chunked_evaluate_layouts",
+        "evaluate_metrics",
+        "reevaluate_layouts",
+    ],
+    "approximate": ["approximate_layouts"],
+    "atlas": ["LayoutAtlas"],
+    "aio": ["best_overall_layout_async", "iter_backend_layouts"],
+    "stats": ["LayoutStats"],
+    "service": ["LayoutService"],
+    "parallel": ["parallel_evaluate_layouts"],
+    "export": ["save_layouts", "load_layouts"],
+}
+_LAZY_MODULES = {
+    name: module for module, names in _LAZY_NAMES.items() for name in names
+}
+_SUBMODULES = set(_LAZY_NAMES) | {
+    "backends",
+    "cli",
+    "scoring",
+}
+
+__all__ = list(_LAZY_MODULES) + ["about"]
+
+
+def __getattr__(name):
+    if name in _LAZY_MODULES:
+        module = importlib.import_module("." + _LAZY_MODULES[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    if name in _SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | _SUBMODULES)
 
 
 def about():
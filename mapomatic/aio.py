@@ -0,0 +1,187 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Asyncio variants of the layout selection routines"""
+
+import asyncio
+import contextvars
+import functools
+
+from .backends import BackendSnapshot
+from .layouts import _best_layout, _check_approximate, default_cost
+
+
+async def iter_backend_layouts(
+    circ,
+    backends,
+    call_limit=int(3e7),
+    cost_function=None,
+    approximate=False,
+    time_budget=1.0,
+    executor=None,
+    timeout=None,
+):
+    """Asynchronously find the best layout on each backend, yielding the
+    results as they finish.
+
+    The configuration and calibration data of all backends are fetched
+    concurrently, and VF2 matching and scoring run in ``executor``.
+
+    Parameters:
+        circ (QuantumCircuit): Quantum circuit
+        backends (IBMQBackend or list): A single or list of backends.
+        call_limit (int): Maximum number of calls to VF2 mapper.
+        cost_function (callable): Custom cost function, default=None
+        approximate (bool): Fall back to ``approximate_layouts`` on backends
+                            without an exact match, default=False.  Only
+                            available with ``default_cost`` and
+                            ``default_log_cost``
+        time_budget (float): Time in sec for each approximate search
+        executor (Executor): Executor for blocking work, default is the
+                             event loop default executor
+        timeout (float): Seconds after which unfinished backends are cancelled
+
+    Yields:
+        tuple: (best_layout, backend_name, best_error) for each backend that
+        can run the circuit
+
+    Raises:
+        asyncio.TimeoutError: The timeout expired before all backends finished
+        ValueError: ``approximate`` with a cost function other than
+                    ``default_cost`` or ``default_log_cost``
+
+    Notes:
+        Work already started in an executor thread cannot be interrupted.
+        On timeout it is abandoned and its result discarded.
+    """
+    if not isinstance(backends, list):
+        backends = [backends]
+    if cost_function is None:
+        cost_function = default_cost
+    _check_approximate(cost_function, approximate)
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    pending = {
+        asyncio.ensure_future(
+            _backend_layout(
+                circ,
+                backend,
+                executor,
+                call_limit,
+                cost_function,
+                approximate,
+                time_budget,
+            )
+        )
+        for backend in backends
+    }
+    try:
+        while pending:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                raise asyncio.TimeoutError()
+            for task in done:
+                result = task.result()
+                if result is not None:
+                    yield result
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def best_overall_layout_async(
+    circ,
+    backends,
+    successors=False,
+    call_limit=int(3e7),
+    cost_function=None,
+    approximate=False,
+    time_budget=1.0,
+    executor=None,
+    timeout=None,
+):
+    """Asynchronous version of ``best_overall_layout``.
+
+    Parameters:
+        circ (QuantumCircuit): Quantum circuit
+        backends (IBMQBackend or list): A single or list of backends.
+        successors (bool): Return list best mappings per backend passed.
+        call_limit (int): Maximum number of calls to VF2 mapper.
+        cost_function (callable): Custom cost function, default=None
+        approximate (bool): Fall back to ``approximate_layouts`` on backends
+                            without an exact match, default=False
+        time_budget (float): Time in sec for each approximate search
+        executor (Executor): Executor for blocking work, default is the
+                             event loop default executor
+        timeout (float): Seconds after which unfinished backends are
+                         cancelled and left out of the results
+
+    Returns:
+        tuple: (best_layout, best_backend, best_error)
+        list: List of tuples for best match for each backend
+    """
+    best_out = []
+    try:
+        async for result in iter_backend_layouts(
+            circ,
+            backends,
+            call_limit=call_limit,
+            cost_function=cost_function,
+            approximate=approximate,
+            time_budget=time_budget,
+            executor=executor,
+            timeout=timeout,
+        ):
+            best_out.append(result)
+    except asyncio.TimeoutError:
+        pass
+    best_out.sort(key=lambda x: x[2])
+    if successors:
+        return best_out
+    if best_out:
+        return best_out[0]
+    return best_out
+
+
+async def _backend_layout(
+    circ, backend, executor, call_limit, cost_function, approximate, time_budget
+):
+    """Fetch the data of a backend, then find its best layout in the executor"""
+    configuration, properties = await asyncio.gather(
+        _run(executor, backend.configuration), _run(executor, backend.properties)
+    )
+    snapshot = BackendSnapshot(backend, configuration, properties)
+    return await _run(
+        executor,
+        functools.partial(
+            _best_layout,
+            circ,
+            snapshot,
+            call_limit,
+            cost_function,
+            approximate,
+            time_budget,
+        ),
+    )
+
+
+def _run(executor, func):
+    """Run a function in an executor within the current context"""
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(executor, context.run, func)
@@ -0,0 +1,332 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Approximate layouts for circuits that do not embed into a device"""
+
+import math
+import random
+import time
+
+import numpy as np
+from rustworkx import PyGraph, all_pairs_dijkstra_path_lengths, distance_matrix
+
+from .stats import current_stats
+
+
+def approximate_layouts(
+    circ,
+    backend,
+    num_layouts=10,
+    time_budget=1.0,
+    max_iterations=None,
+    seed=None,
+    log_cost=False,
+):
+    """Find good layouts for a circuit whose interaction graph is not
+    a subgraph of the backend coupling map.
+
+    Layouts are grown greedily from several starting qubits and then refined
+    by simulated annealing.  Interactions between qubits that are not
+    adjacent on the device are charged the 2Q errors of the SWAP gates
+    needed to bring them together along the lowest-error path.
+
+    Parameters:
+        circ (QuantumCircuit): circuit of interest
+        backend (IBMQBackend): An IBM Quantum backend instance
+        num_layouts (int): Maximum number of layouts returned
+        time_budget (float): Time in sec after which the search stops
+        max_iterations (int): Maximum number of annealing steps, default=None
+        seed (int): Seed for the random number generator
+        log_cost (bool): Return the estimated negative log-fidelity, as
+                         ``default_log_cost``, instead of the error,
+                         default=False
+
+    Returns:
+        list: Tuples of layout and estimated cost, sorted by cost.  Empty if
+        the circuit does not fit into any connected part of the device.
+
+    Raises:
+        ValueError: Circuit is larger than the backend
+    """
+    deadline = time.perf_counter() + time_budget
+    rng = random.Random(seed)
+    config = backend.configuration()
+    num_qubits = circ.num_qubits
+    if num_qubits > config.num_qubits:
+        raise ValueError("Circuit does not fit on backend.")
+    if not num_qubits:
+        return []
+    costs = _layout_costs(circ, backend)
+    neighbors = [[] for _ in range(config.num_qubits)]
+    for edge in {tuple(sorted(edge)) for edge in config.coupling_map}:
+        neighbors[edge[0]].append(edge[1])
+        neighbors[edge[1]].append(edge[0])
+
+    # Greedy growth from the qubits with the lowest error neighbourhoods
+    edge_cost = costs["pair"].copy()
+    edge_cost[~np.isfinite(edge_cost)] = 0
+    local = np.array(
+        [
+            np.mean(edge_cost[qubit, nbrs]) if nbrs else np.inf
+            for qubit, nbrs in enumerate(neighbors)
+        ]
+    )
+    starts = np.argsort(local, kind="stable")[: max(num_layouts, 8)]
+    found = {}
+    for start in starts:
+        layout = _greedy_layout(costs, int(start))
+        cost = _total_cost(costs, layout)
+        # Layouts spanning disconnected parts of the device cannot be routed
+        if math.isfinite(cost):
+            found[tuple(layout)] = cost
+        if time.perf_counter() > deadline:
+            break
+    if not found:
+        return []
+
+    # Anneal the best greedy layouts
+    seeds = sorted(found, key=found.get)[:num_layouts]
+    iterations = None
+    if max_iterations is not None:
+        iterations = max_iterations // len(seeds)
+    for idx, layout in enumerate(seeds):
+        sub_deadline = time.perf_counter() + (deadline - time.perf_counter()) / (
+            len(seeds) - idx
+        )
+        best, best_cost = _anneal(
+            costs, list(layout), neighbors, rng, iterations, sub_deadline
+        )
+        found[tuple(best)] = best_cost
+    if log_cost:
+        out = [(list(layout), cost) for layout, cost in found.items()]
+    else:
+        out = [(list(layout), 1 - math.exp(-cost)) for layout, cost in found.items()]
+    out.sort(key=lambda x: x[1])
+    return out[:num_layouts]
+
+
+def _layout_costs(circ, backend):
+    """Log-infidelity cost tables for placing a circuit on a backend.
+
+    Parameters:
+        circ (QuantumCircuit): circuit of interest
+        backend (IBMQBackend): An IBM Quantum backend instance
+
+    Returns:
+        dict: Single qubit costs per logical and physical qubit, the estimated
+        cost of a 2Q gate between any two physical qubits, and the circuit
+        interactions as arrays of qubit pairs and counts.
+    """
+    with current_stats().stage("properties"):
+        props = backend.properties()
+    num_qubits = backend.configuration().num_qubits
+    single = {}
+    pair = {}
+    for gate in props.gates:
+        errors = [
+            param.value for param in gate.parameters if param.name == "gate_error"
+        ]
+        if not errors:
+            continue
+        error = min(errors[0], 1 - 1e-12)
+        if len(gate.qubits) == 1:
+            single.setdefault(gate.gate, np.zeros(num_qubits))[gate.qubits[0]] = error
+        elif len(gate.qubits) == 2:
+            edge = tuple(sorted(gate.qubits))
+            pair[edge] = min(pair.get(edge, 1), error)
+    single["measure"] = np.array(
+        [min(props.readout_error(qubit), 1 - 1e-12) for qubit in range(num_qubits)]
+    )
+    single["reset"] = single["measure"]
+
+    graph = PyGraph(multigraph=False)
+    graph.add_nodes_from(range(num_qubits))
+    for edge in backend.configuration().coupling_map:
+        edge = tuple(sorted(edge))
+        # Couplers without calibration data are charged the maximal error
+        graph.add_edge(edge[0], edge[1], -math.log1p(-pair.get(edge, 1 - 1e-12)))
+    weights = np.full((num_qubits, num_qubits), np.inf)
+    for source, lengths in all_pairs_dijkstra_path_lengths(graph, float).items():
+        weights[source, list(lengths.keys())] = list(lengths.values())
+    hops = distance_matrix(graph, null_value=np.inf)
+    # Routing over a path of k edges takes k-1 SWAPs (3 gates each) plus the gate
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pair_cost = 3 * weights - 2 * weights / hops
+    pair_cost[~np.isfinite(weights)] = np.inf
+    for edge_a, edge_b, weight in graph.weighted_edge_list():
+        pair_cost[edge_a, edge_b] = pair_cost[edge_b, edge_a] = weight
+    np.fill_diagonal(pair_cost, 0)
+
+    logical = np.zeros((circ.num_qubits, num_qubits))
+    counts = {}
+    for item in circ._data:
+        name = item[0].name
+        qubits = [circ.find_bit(qubit).index for qubit in item[1]]
+        if item[0].num_qubits == 2 and name != "barrier":
+            key = tuple(sorted(qubits))
+            counts[key] = counts.get(key, 0) + 1
+        elif name in ["sx", "x", "measure", "reset"] and name in single:
+            logical[qubits[0]] -= np.log1p(-single[name])
+    interactions = np.array(list(counts), dtype=int).reshape(-1, 2)
+    involved = [[] for _ in range(circ.num_qubits)]
+    for idx, (qubit_a, qubit_b) in enumerate(interactions):
+        involved[qubit_a].append(idx)
+        involved[qubit_b].append(idx)
+    return {
+        "single": logical,
+        "pair": pair_cost,
+        "interactions": interactions,
+        "counts": np.array(list(counts.values()), dtype=float),
+        "involved": involved,
+    }
+
+
+def _total_cost(costs, layout):
+    """Estimated log-infidelity of a layout"""
+    layout = np.asarray(layout)
+    pairs = costs["interactions"]
+    out = costs["single"][np.arange(layout.size), layout].sum()
+    if pairs.size:
+        out += np.dot(
+            costs["counts"], costs["pair"][layout[pairs[:, 0]], layout[pairs[:, 1]]]
+        )
+    return float(out)
+
+
+def _greedy_layout(costs, start):
+    """Grow a layout by placing qubits next to their already placed partners.
+
+    Parameters:
+        costs (dict): Output of ``_layout_costs``
+        start (int): Physical qubit of the first placed qubit
+
+    Returns:
+        list: Layout
+    """
+    num_logical, num_physical = costs["single"].shape
+    weights = np.zeros((num_logical, num_logical))
+    for (qubit_a, qubit_b), count in zip(costs["interactions"], costs["counts"]):
+        weights[qubit_a, qubit_b] = weights[qubit_b, qubit_a] = count
+    layout = [None] * num_logical
+    free = np.ones(num_physical, dtype=bool)
+    placed = []
+    unplaced = set(range(num_logical))
+    first = int(np.argmax(weights.sum(axis=1)))
+    layout[first] = start
+    free[start] = False
+    placed.append(first)
+    unplaced.remove(first)
+    while unplaced:
+        # Place the qubit with the most interactions with placed qubits
+        candidates = sorted(unplaced)
+        qubit = max(candidates, key=lambda q: weights[q, placed].sum())
+        cost = costs["single"][qubit].copy()
+        for other in placed:
+            if weights[qubit, other]:
+                cost += weights[qubit, other] * costs["pair"][layout[other]]
+        if not weights[qubit, placed].any():
+            # Keep disconnected qubits close to the rest of the layout
+            cost += 1e-9 * np.min(costs["pair"][[layout[q] for q in placed]], axis=0)
+        # Only free qubits, even when none of them is reachable
+        candidates = np.flatnonzero(free)
+        phys = int(candidates[np.argmin(cost[candidates])])
+        layout[qubit] = phys
+        free[phys] = False
+        placed.append(qubit)
+        unplaced.remove(qubit)
+    return layout
+
+
+def _anneal(costs, layout, neighbors, rng, iterations, deadline):
+    """Refine a layout with simulated annealing.
+
+    Moves either relocate a qubit onto a free neighbouring physical qubit or
+    swap it with the qubit occupying that neighbour.
+
+    Parameters:
+        costs (dict): Output of ``_layout_costs``
+        layout (list): Initial layout
+        neighbors (list): Neighbours of each physical qubit
+        rng (Random): Random number generator
+        iterations (int): Number of steps, or None to run until the deadline
+        deadline (float): ``time.perf_counter`` value at which to stop
+
+    Returns:
+        tuple: Best layout found and its cost
+    """
+    pairs = costs["interactions"]
+    counts = costs["counts"]
+    single = costs["single"]
+    pair = costs["pair"]
+    occupant = {phys: qubit for qubit, phys in enumerate(layout)}
+    cost = _total_cost(costs, layout)
+    best, best_cost = list(layout), cost
+    temperature = 0.1 * cost / max(len(layout), 1) or 1e-3
+    step = 0
+    last_improvement = 0
+    while iterations is None or step < iterations:
+        if step % 100 == 0 and time.perf_counter() > deadline:
+            break
+        # Frozen and not improving anymore
+        if step - last_improvement > 5000:
+            break
+        step += 1
+        qubit = rng.randrange(len(layout))
+        if not neighbors[layout[qubit]]:
+            continue
+        target = rng.choice(neighbors[layout[qubit]])
+        other = occupant.get(target)
+        moved = [qubit] if other is None else [qubit, other]
+        affected = set(costs["involved"][qubit])
+        if other is not None:
+            affected.update(costs["involved"][other])
+        affected = list(affected)
+
+        old = sum(single[q, layout[q]] for q in moved)
+        if affected:
+            old += np.dot(
+                counts[affected],
+                pair[
+                    [layout[q] for q in pairs[affected, 0]],
+                    [layout[q] for q in pairs[affected, 1]],
+                ],
+            )
+        source = layout[qubit]
+        layout[qubit] = target
+        if other is not None:
+            layout[other] = source
+        new = sum(single[q, layout[q]] for q in moved)
+        if affected:
+            new += np.dot(
+                counts[affected],
+                pair[
+                    [layout[q] for q in pairs[affected, 0]],
+                    [layout[q] for q in pairs[affected, 1]],
+                ],
+            )
+        delta = new - old
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            cost += delta
+            occupant[target] = qubit
+            if other is None:
+                del occupant[source]
+            else:
+                occupant[source] = other
+            if cost < best_cost - 1e-12:
+                best, best_cost = list(layout), cost
+                last_improvement = step
+        else:
+            layout[qubit] = source
+            if other is not None:
+                layout[other] = target
+        temperature *= 0.999
+    return best, _total_cost(costs, best)
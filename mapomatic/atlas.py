@@ -0,0 +1,244 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Precomputed layouts of common interaction shapes"""
+
+import numpy as np
+from rustworkx import PyGraph, generators, vf2_mapping
+
+# Shape generators, keyed by shape kind, taking the number of qubits
+SHAPES = {
+    "line": generators.path_graph,
+    "ring": generators.cycle_graph,
+    "star": generators.star_graph,
+}
+
+
+def default_shapes(cmap):
+    """Default shape family for a coupling map: lines of 2 to 8 qubits,
+    rings of 4 to 12 qubits and stars of 4 qubits up to one more than the
+    maximum device degree.
+
+    Parameters:
+        cmap (CouplingMap): Coupling map
+
+    Returns:
+        list: Tuples of shape kind and size
+    """
+    graph = cmap.graph.to_undirected(multigraph=False)
+    max_degree = max((graph.degree(node) for node in graph.node_indexes()), default=0)
+    return (
+        [("line", size) for size in range(2, 9)]
+        + [("ring", size) for size in range(4, 13)]
+        + [("star", size) for size in range(4, max_degree + 2)]
+    )
+
+
+class LayoutAtlas:
+    """Embeddings of a family of interaction shapes into one coupling map.
+
+    Circuits whose interaction graph is isomorphic to one of the shapes get
+    their layouts by relabelling the stored embeddings, without running VF2.
+
+    Parameters:
+        cmap (CouplingMap): Coupling map
+        embeddings (dict): Embedding arrays of shape (num_embeddings, size),
+                           keyed by ``(kind, size)``
+    """
+
+    def __init__(self, cmap, embeddings):
+        self.cmap = cmap
+        self.embeddings = embeddings
+        num_qubits = cmap.size()
+        self._adjacency = np.zeros((num_qubits, num_qubits), dtype=bool)
+        for edge in cmap.get_edges():
+            self._adjacency[edge[0], edge[1]] = True
+        self._edges = {tuple(edge) for edge in cmap.get_edges()}
+        self._graphs = {key: SHAPES[key[0]](key[1]) for key in embeddings}
+
+    @classmethod
+    def build(cls, cmap, shapes=None, call_limit=None):
+        """Enumerate the embeddings of a shape family into a coupling map.
+
+        Parameters:
+            cmap (list or CouplingMap or BackendV2): Coupling map or backend
+            shapes (list): Tuples of shape kind (``"line"``, ``"ring"`` or
+                           ``"star"``) and number of qubits,
+                           default=``default_shapes``
+            call_limit (int): Max number of calls to VF2 mapper per shape.
+                              Shapes that hit the limit are stored with
+                              only the embeddings found, default=None
+
+        Returns:
+            LayoutAtlas: Atlas of the shapes
+        """
+        cmap = _coupling_map(cmap)
+        if shapes is None:
+            shapes = default_shapes(cmap)
+        graph = cmap.graph.to_undirected(multigraph=False)
+        embeddings = {}
+        for kind, size in shapes:
+            shape = SHAPES[kind](size)
+            mappings = vf2_mapping(
+                graph,
+                shape,
+                subgraph=True,
+                id_order=False,
+                induced=False,
+                call_limit=call_limit,
+            )
+            rows = []
+            for mapping in mappings:
+                row = [0] * size
+                for cm_i, shape_i in mapping.items():
+                    row[shape_i] = cm_i
+                rows.append(row)
+            embeddings[(kind, size)] = np.array(rows, dtype=np.int32).reshape(-1, size)
+        return cls(cmap, embeddings)
+
+    def save(self, path):
+        """Save the atlas to an ``.npz`` file.
+
+        Parameters:
+            path (str): File path
+        """
+        arrays = {
+            "coupling_map": np.array(self.cmap.get_edges(), dtype=np.int32).reshape(
+                -1, 2
+            ),
+            "num_qubits": np.array(self.cmap.size()),
+        }
+        for (kind, size), rows in self.embeddings.items():
+            arrays["{}_{}".format(kind, size)] = rows
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load an atlas saved with ``save``.
+
+        Parameters:
+            path (str): File path
+
+        Returns:
+            LayoutAtlas: Loaded atlas
+        """
+        # pylint: disable=import-outside-toplevel
+        from qiskit.transpiler.coupling import CouplingMap
+
+        with np.load(path) as data:
+            cmap = CouplingMap(data["coupling_map"].tolist())
+            for qubit in range(cmap.size(), int(data["num_qubits"])):
+                cmap.add_physical_qubit(qubit)
+            embeddings = {}
+            for key in data.files:
+                if key in ["coupling_map", "num_qubits"]:
+                    continue
+                kind, size = key.rsplit("_", 1)
+                embeddings[(kind, int(size))] = data[key]
+        return cls(cmap, embeddings)
+
+    def matches(self, cmap):
+        """Whether the atlas was built for a coupling map.
+
+        Parameters:
+            cmap (CouplingMap): Coupling map
+
+        Returns:
+            bool: True if the coupling map has the qubits and edges of the
+            atlas
+        """
+        if cmap is self.cmap:
+            return True
+        return cmap.size() == self.cmap.size() and self._edges == {
+            tuple(edge) for edge in cmap.get_edges()
+        }
+
+    def shape_of(self, circ):
+        """Find the atlas shape isomorphic to the interaction graph of a circuit.
+
+        Parameters:
+            circ (QuantumCircuit): Input quantum circuit
+
+        Returns:
+            tuple: Shape key and, for each circuit qubit, the matching shape
+            node, or None if no shape matches
+        """
+        edges = set()
+        for item in circ._data:
+            if item[0].num_qubits == 2 and item[0].name != "barrier":
+                qubits = tuple(sorted(circ.find_bit(qubit).index for qubit in item[1]))
+                edges.add(qubits)
+        graph = PyGraph(multigraph=False)
+        graph.add_nodes_from(range(circ.num_qubits))
+        graph.add_edges_from_no_data(list(edges))
+        degrees = sorted(graph.degree(node) for node in graph.node_indexes())
+        for key, shape in self._graphs.items():
+            if shape.num_nodes() != graph.num_nodes():
+                continue
+            if shape.num_edges() != graph.num_edges():
+                continue
+            if sorted(shape.degree(node) for node in shape.node_indexes()) != degrees:
+                continue
+            mapping = next(
+                iter(vf2_mapping(shape, graph, subgraph=False, id_order=False)), None
+            )
+            if mapping is not None:
+                nodes = [0] * circ.num_qubits
+                for shape_i, circ_i in mapping.items():
+                    nodes[circ_i] = shape_i
+                return key, nodes
+        return None
+
+    def layouts(self, circ, strict_direction=True):
+        """Layouts of a circuit served from the atlas.
+
+        Gives the same layouts as ``matching_layouts``, possibly in a
+        different order.
+
+        Parameters:
+            circ (QuantumCircuit): Input quantum circuit
+            strict_direction (bool): Use directed coupling
+
+        Returns:
+            list: Found mappings, or None if the circuit interaction graph
+            is not an atlas shape
+        """
+        found = self.shape_of(circ)
+        if found is None:
+            return None
+        key, nodes = found
+        layouts = self.embeddings[key][:, nodes]
+        if strict_direction:
+            keep = np.ones(layouts.shape[0], dtype=bool)
+            pairs = set()
+            for item in circ._data:
+                if item[0].num_qubits == 2 and item[0].name != "barrier":
+                    pairs.add(tuple(circ.find_bit(qubit).index for qubit in item[1]))
+            for qubit_a, qubit_b in pairs:
+                keep &= self._adjacency[layouts[:, qubit_a], layouts[:, qubit_b]]
+            layouts = layouts[keep]
+        return layouts.tolist()
+
+
+def _coupling_map(cmap):
+    """Coupling map from a list, CouplingMap or BackendV2"""
+    # pylint: disable=import-outside-toplevel
+    from qiskit.providers.backend import BackendV2
+    from qiskit.transpiler.coupling import CouplingMap
+
+    if isinstance(cmap, list):
+        return CouplingMap(cmap)
+    if isinstance(cmap, CouplingMap):
+        return cmap
+    if isinstance(cmap, BackendV2):
+        return cmap.coupling_map
+    raise TypeError("Invalid cmap input.")
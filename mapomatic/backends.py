@@ -0,0 +1,125 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Backend helpers"""
+
+import datetime
+import json
+
+from .scoring import ErrorTables
+
+
+class BackendSnapshot:
+    """A backend with its configuration and calibration data fetched once.
+
+    A snapshot can be passed wherever mapomatic expects a backend, including
+    to cost functions.  ``configuration()`` and ``properties()`` return the
+    stored data rather than fetching it again, and all other attributes are
+    looked up on the wrapped backend.
+
+    Snapshots saved with ``save_snapshot`` load without the backend, in
+    which case only the configuration, calibration data and name are
+    available.
+
+    Parameters:
+        backend (IBMQBackend): An IBM Quantum backend instance, or None
+        configuration (BackendConfiguration): Configuration, fetched if None
+        properties (BackendProperties): Calibration data, fetched if None
+    """
+
+    def __init__(self, backend, configuration=None, properties=None):
+        self.backend = backend
+        if configuration is None:
+            configuration = backend.configuration()
+        if properties is None:
+            properties = backend.properties()
+        self._configuration = configuration
+        self._properties = properties
+        self._error_tables = None
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name == "backend":
+            raise AttributeError(name)
+        if self.backend is None:
+            if name == "name":
+                return self._configuration.backend_name
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    def __repr__(self):
+        return "<BackendSnapshot({})>".format(self._configuration.backend_name)
+
+    def configuration(self):
+        """Stored backend configuration"""
+        return self._configuration
+
+    def properties(self):
+        """Stored backend calibration data"""
+        return self._properties
+
+    def error_tables(self):
+        """Error tables of the stored calibration data, built on first use
+
+        Returns:
+            ErrorTables: Error tables of the backend
+        """
+        if self._error_tables is None:
+            self._error_tables = ErrorTables.from_backend(self)
+        return self._error_tables
+
+
+def save_snapshot(backend, path):
+    """Save the configuration and calibration data of a backend to a JSON file.
+
+    Parameters:
+        backend (IBMQBackend): An IBM Quantum backend instance
+        path (str): File path
+    """
+    data = {
+        "configuration": backend.configuration().to_dict(),
+        "properties": backend.properties().to_dict(),
+    }
+    with open(path, "w", encoding="utf-8") as fd:
+        json.dump(data, fd, default=_json_default)
+
+
+def load_snapshot(path):
+    """Load a backend snapshot saved with ``save_snapshot``.
+
+    Requires ``qiskit-ibm-runtime`` for the configuration and calibration
+    data models.
+
+    Parameters:
+        path (str): File path
+
+    Returns:
+        BackendSnapshot: Snapshot without a wrapped backend
+    """
+    # pylint: disable=import-outside-toplevel
+    from qiskit_ibm_runtime.models import BackendProperties, QasmBackendConfiguration
+
+    with open(path, encoding="utf-8") as fd:
+        data = json.load(fd)
+    return BackendSnapshot(
+        None,
+        QasmBackendConfiguration.from_dict(data["configuration"]),
+        BackendProperties.from_dict(data["properties"]),
+    )
+
+
+def _json_default(obj):
+    """JSON encoding of the dates and complex numbers in backend data"""
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    if isinstance(obj, complex):
+        return [obj.real, obj.imag]
+    raise TypeError("Object of type {} is not JSON serializable".format(type(obj)))
@@ -13,7 +13,6 @@
 
 """Circuit manipulation tools"""
 import numbers
-from qiskit import QuantumCircuit
 
 
 def deflate_circuit(input_circ):
@@ -28,6 +27,9 @@ def deflate_circuit(input_circ):
     Notes:
         Requires a circuit with flatten qregs and cregs.
     """
+    # pylint: disable=import-outside-toplevel
+    from qiskit import QuantumCircuit
+
     active_qubits, active_clbits = active_bits(input_circ)
 
     num_reduced_qubits = len(active_qubits)
@@ -106,6 +108,9 @@ def inflate_circuit(input_circ, layout, backend):
     Notes:
         Requires a circuit with flatten qregs and cregs.
     """
+    # pylint: disable=import-outside-toplevel
+    from qiskit import QuantumCircuit
+
     if isinstance(backend, numbers.Integral):
         num_qubits = backend
     else:
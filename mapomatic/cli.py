@@ -0,0 +1,315 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Command line batch layout selection for QPY circuit files"""
+
+import argparse
+import collections
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .backends import load_snapshot
+from .circuits import deflate_circuit
+from .export import LayoutTable, LayoutTableWriter
+from .layouts import default_cost
+from .service import PreparedBackend, best_prepared_layout
+
+# Prepared backends and settings of a worker process
+_WORKER_STATE = {}
+
+
+def main(argv=None):
+    """Entry point of the ``mapomatic`` command.
+
+    Parameters:
+        argv (list): Command line arguments, default ``sys.argv[1:]``
+
+    Returns:
+        int: Exit status
+    """
+    args = _parser().parse_args(argv)
+    backends = [_backend(name) for name in args.backend]
+    prepared = {}
+    for backend in backends:
+        item = PreparedBackend(backend)
+        prepared[item.name] = item
+    settings = (args.call_limit, default_cost, False, 1.0)
+
+    if args.format == "table":
+        if args.output == "-":
+            raise SystemExit("mapomatic: --format table needs an --output directory")
+        num_qubits = max(
+            item.snapshot.configuration().num_qubits for item in prepared.values()
+        )
+        out = _TableOutput(args.output, args.resume, num_qubits)
+    else:
+        out = _JsonlOutput(args.output, args.resume)
+    reporter = _Reporter(args.progress)
+    try:
+        if args.workers == 0:
+            _init_worker(prepared, settings)
+            for key, circ in _circuits(args.paths, out.done):
+                out.write(key, _layouts(circ, args.deflate))
+                reporter.update()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=args.workers,
+                initializer=_init_worker,
+                initargs=(prepared, settings),
+            ) as executor:
+                # Results are written in input order, with a bounded number
+                # of circuits in flight
+                pending = collections.deque()
+                max_pending = 4 * (args.workers or os.cpu_count() or 1)
+                for key, circ in _circuits(args.paths, out.done):
+                    pending.append((key, executor.submit(_layouts, circ, args.deflate)))
+                    while len(pending) >= max_pending:
+                        key, future = pending.popleft()
+                        out.write(key, future.result())
+                        reporter.update()
+                while pending:
+                    key, future = pending.popleft()
+                    out.write(key, future.result())
+                    reporter.update()
+    finally:
+        out.close()
+    reporter.summary()
+    return 0
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog="mapomatic",
+        description="Find the best layouts of the circuits in QPY files "
+        "across a set of backends, writing the results as they come in.",
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="QPY files, or directories searched for *.qpy files"
+    )
+    parser.add_argument(
+        "-b",
+        "--backend",
+        action="append",
+        required=True,
+        help="Fake backend name, e.g. FakeMontrealV2 or fake_montreal, or a "
+        "snapshot file saved with mapomatic.backends.save_snapshot.  Repeat "
+        "for more backends.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="-",
+        help="Output file or table directory, default stdout",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["jsonl", "table"],
+        default="jsonl",
+        help="JSON lines, or a columnar table directory readable with "
+        "mapomatic.load_layouts",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes, 0 to run in this process, "
+        "default the CPU count",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Append to the output file, skipping circuits already in it",
+    )
+    parser.add_argument(
+        "--no-deflate",
+        dest="deflate",
+        action="store_false",
+        help="Do not deflate the circuits before matching",
+    )
+    parser.add_argument(
+        "--call-limit",
+        type=int,
+        default=int(3e7),
+        help="Maximum number of calls to the VF2 mapper per backend",
+    )
+    parser.add_argument(
+        "--progress",
+        type=float,
+        default=10.0,
+        help="Seconds between throughput reports on stderr, 0 to disable",
+    )
+    return parser
+
+
+def _backend(name):
+    """Backend from a snapshot file or a fake backend name"""
+    if os.path.isfile(name):
+        return load_snapshot(name)
+    # pylint: disable=import-outside-toplevel
+    from qiskit_ibm_runtime import fake_provider
+
+    candidates = [name, "".join(part.capitalize() for part in name.split("_")) + "V2"]
+    for candidate in candidates:
+        backend_class = getattr(fake_provider, candidate, None)
+        if isinstance(backend_class, type):
+            return backend_class()
+    raise ValueError("Unknown backend {}".format(name))
+
+
+def _circuits(paths, done):
+    """Yield ``((path, index), circuit)`` for the circuits not yet done.
+
+    QPY files are loaded whole, one file at a time.
+    """
+    # pylint: disable=import-outside-toplevel
+    from qiskit import qpy
+
+    for path in _qpy_files(paths):
+        with open(path, "rb") as fd:
+            circuits = qpy.load(fd)
+        for index, circ in enumerate(circuits):
+            if (path, index) not in done:
+                yield (path, index), circ
+
+
+def _qpy_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(".qpy"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _layouts(circ, deflate):
+    """Best layout on each backend, run in a worker process"""
+    name = circ.name
+    if deflate:
+        circ = deflate_circuit(circ)
+    return (
+        name,
+        circ.num_qubits,
+        best_prepared_layout(
+            circ, _WORKER_STATE["prepared"], True, *_WORKER_STATE["settings"]
+        ),
+    )
+
+
+def _init_worker(prepared, settings):
+    _WORKER_STATE["prepared"] = list(prepared.values())
+    _WORKER_STATE["settings"] = settings
+
+
+class _JsonlOutput:
+    """One JSON line per circuit, resumed after the last complete line"""
+
+    def __init__(self, path, resume):
+        self.done = set()
+        if path == "-":
+            self.fd = sys.stdout
+            return
+        if resume and os.path.exists(path):
+            with open(path, "rb+") as fd:
+                data = fd.read()
+                end = data.rfind(b"\n") + 1
+                if end < len(data):
+                    fd.truncate(end)
+            for line in data[:end].splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    self.done.add((record["path"], record["index"]))
+        # pylint: disable=consider-using-with
+        self.fd = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def write(self, key, result):
+        """Write the layouts of the circuit at ``key`` as a JSON line"""
+        name, num_qubits, layouts = result
+        record = {
+            "path": key[0],
+            "index": key[1],
+            "name": name,
+            "num_qubits": num_qubits,
+            "layouts": [list(item) for item in layouts],
+        }
+        self.fd.write(json.dumps(record) + "\n")
+        self.fd.flush()
+
+    def close(self):
+        """Close the output file"""
+        if self.fd is not sys.stdout:
+            self.fd.close()
+
+
+class _TableOutput:
+    """Columnar table with one row per circuit and backend"""
+
+    def __init__(self, path, resume, num_qubits):
+        self.writer = LayoutTableWriter(path, num_qubits=num_qubits, append=resume)
+        self.done = set()
+        if self.writer.num_circuits:
+            for circuit in LayoutTable(path).circuits[: self.writer.num_circuits]:
+                self.done.add((circuit["path"], circuit["index"]))
+
+    def write(self, key, result):
+        """Write the layouts of the circuit at ``key`` as table rows"""
+        name, num_qubits, layouts = result
+        circuit = {
+            "path": key[0],
+            "index": key[1],
+            "name": name,
+            "num_qubits": num_qubits,
+        }
+        self.writer.write(layouts, circuit=circuit)
+
+    def close(self):
+        """Close the table writer"""
+        self.writer.close()
+
+
+class _Reporter:
+    """Throughput reports on stderr"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.count = 0
+        self.start = self.last = time.perf_counter()
+
+    def update(self):
+        """Count a finished circuit, reporting if the interval passed"""
+        self.count += 1
+        now = time.perf_counter()
+        if self.interval and now - self.last >= self.interval:
+            self.last = now
+            self._report(now)
+
+    def summary(self):
+        """Report the totals of the run"""
+        if self.interval:
+            self._report(time.perf_counter())
+
+    def _report(self, now):
+        elapsed = now - self.start
+        rate = self.count / elapsed if elapsed else 0.0
+        print(
+            "{} circuits in {:.1f} s ({:.2f} circuits/s)".format(
+                self.count, elapsed, rate
+            ),
+            file=sys.stderr,
+        )
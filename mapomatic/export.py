@@ -0,0 +1,365 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Columnar storage of layout scores"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+# Rows buffered before they are written out
+DEFAULT_CHUNK_SIZE = 2**16
+
+# Size of the .npy header reserved at the start of every column file
+_HEADER_SIZE = 128
+
+_COLUMNS = {
+    "layouts": np.int32,
+    "backends": np.int32,
+    "costs": np.float64,
+    "circuits": np.int64,
+}
+
+
+class LayoutTableWriter:
+    """Write layout scores to a directory of column files, in chunks.
+
+    Every column is a ``.npy`` file: ``layouts`` holds one row of physical
+    qubits per layout, padded with -1 to ``num_qubits``, ``backends`` the
+    index of the backend name, ``costs`` the cost, and ``circuits`` the
+    index of the circuit.  Backend names and the row and circuit counts are
+    kept in ``meta.json``, and the circuit descriptions one per line in
+    ``circuits.jsonl``.  The metadata is updated after every chunk, so a
+    table is readable up to its last complete chunk even if writing stops.
+
+    Parameters:
+        path (str): Directory of the table
+        num_qubits (int): Layout width, default the width of the first rows
+        chunk_size (int): Number of rows buffered before writing
+        append (bool): Add to an existing table instead of replacing it
+
+    Example:
+        .. code-block:: python
+
+            with LayoutTableWriter("scores") as writer:
+                for backend in backends:
+                    layouts = mm.matching_layouts(trans_qc, backend)
+                    writer.write(mm.evaluate_layouts(trans_qc, layouts, backend),
+                                 backend=backend.name)
+    """
+
+    def __init__(
+        self, path, num_qubits=None, chunk_size=DEFAULT_CHUNK_SIZE, append=False
+    ):
+        self.path = path
+        self.num_qubits = num_qubits
+        self.chunk_size = chunk_size
+        self.backends = []
+        self.num_rows = 0
+        self.num_circuits = 0
+        self._codes = {}
+        self._buffer = []
+        self._buffered = 0
+        self._circuit_lines = []
+        circuits_bytes = 0
+        if append and os.path.exists(os.path.join(path, "meta.json")):
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as fd:
+                meta = json.load(fd)
+            self.num_qubits = meta["num_qubits"]
+            self.backends = meta["backends"]
+            self.num_rows = meta["num_rows"]
+            self.num_circuits = meta["num_circuits"]
+            circuits_bytes = meta["circuits_bytes"]
+            self._codes = {name: code for code, name in enumerate(self.backends)}
+        else:
+            append = False
+            os.makedirs(path, exist_ok=True)
+        self._files = {}
+        for column in _COLUMNS:
+            file_path = os.path.join(path, column + ".npy")
+            if append:
+                fd = open(file_path, "r+b")  # pylint: disable=consider-using-with
+                # Drop rows written after the last metadata update
+                fd.truncate(_HEADER_SIZE + self.num_rows * self._row_bytes(column))
+                fd.seek(0, os.SEEK_END)
+            else:
+                fd = open(file_path, "wb")  # pylint: disable=consider-using-with
+                fd.write(b"\0" * _HEADER_SIZE)
+            self._files[column] = fd
+        # pylint: disable=consider-using-with
+        self._circuits_file = open(
+            os.path.join(path, "circuits.jsonl"), "r+b" if append else "wb"
+        )
+        self._circuits_file.truncate(circuits_bytes)
+        self._circuits_file.seek(circuits_bytes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, rows, backend=None, circuit=None):
+        """Add layouts and their costs.
+
+        Parameters:
+            rows (list): Tuples of layout, backend name and cost, as returned
+                         by ``best_overall_layout(successors=True)``, or of
+                         layout and cost, as returned by ``evaluate_layouts``
+            backend (str): Backend name of rows without one
+            circuit (dict): JSON serializable description of the circuit
+                            the rows belong to, default=None
+
+        Returns:
+            int: Index of the circuit, or -1 if no circuit is given
+        """
+        layouts = []
+        names = []
+        costs = []
+        for row in rows:
+            layouts.append(row[0])
+            if len(row) == 3:
+                names.append(row[1])
+            else:
+                names.append(backend)
+            costs.append(row[-1])
+        return self.write_arrays(layouts, names, costs, circuit=circuit)
+
+    def write_arrays(self, layouts, backends, costs, circuit=None):
+        """Add layouts and their costs given as arrays.
+
+        Parameters:
+            layouts (ndarray or list): Layouts, one per row
+            backends (str or list): Backend name of all rows, or of each row
+            costs (ndarray or list): Cost of each layout
+            circuit (dict): JSON serializable description of the circuit
+                            the rows belong to, default=None
+
+        Returns:
+            int: Index of the circuit, or -1 if no circuit is given
+        """
+        circuit_index = -1
+        if circuit is not None:
+            circuit_index = self.num_circuits
+            self.num_circuits += 1
+            self._circuit_lines.append(json.dumps(circuit).encode("utf-8") + b"\n")
+        costs = np.asarray(costs, dtype=np.float64).reshape(-1)
+        if isinstance(backends, str) or backends is None:
+            codes = np.full(costs.size, self._code(backends), dtype=np.int32)
+        else:
+            codes = np.array([self._code(name) for name in backends], dtype=np.int32)
+        if costs.size:
+            self._buffer.append(
+                (self._pad(layouts), codes, costs, np.full(costs.size, circuit_index))
+            )
+            self._buffered += costs.size
+        if self._buffered >= self.chunk_size:
+            self.flush()
+        return circuit_index
+
+    def flush(self):
+        """Write out the buffered rows and update the metadata"""
+        if self._buffer:
+            for column, parts in zip(_COLUMNS, zip(*self._buffer)):
+                data = np.concatenate(parts).astype(_COLUMNS[column], copy=False)
+                self._files[column].write(data.tobytes())
+            self.num_rows += self._buffered
+            self._buffer = []
+            self._buffered = 0
+        self._circuits_file.write(b"".join(self._circuit_lines))
+        self._circuit_lines = []
+        for fd in list(self._files.values()) + [self._circuits_file]:
+            fd.flush()
+        meta = {
+            "num_rows": self.num_rows,
+            "num_qubits": self.num_qubits,
+            "backends": self.backends,
+            "num_circuits": self.num_circuits,
+            "circuits_bytes": self._circuits_file.tell(),
+        }
+        # Replace the metadata in one step so it never describes a partial chunk
+        tmp_path = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as fd:
+            json.dump(meta, fd)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+
+    def close(self):
+        """Write out the buffered rows and finish the column file headers"""
+        self.flush()
+        for column, fd in self._files.items():
+            fd.seek(0)
+            fd.write(self._header(column))
+            fd.close()
+        self._circuits_file.close()
+
+    def _code(self, name):
+        if name not in self._codes:
+            self._codes[name] = len(self.backends)
+            self.backends.append(name)
+        return self._codes[name]
+
+    def _pad(self, layouts):
+        if not isinstance(layouts, np.ndarray):
+            width = max(len(layout) for layout in layouts)
+        else:
+            width = layouts.shape[1]
+        if self.num_qubits is None:
+            self.num_qubits = width
+        if width > self.num_qubits:
+            raise ValueError(
+                "Layouts of {} qubits do not fit a table of width {}".format(
+                    width, self.num_qubits
+                )
+            )
+        out = np.full((len(layouts), self.num_qubits), -1, dtype=np.int32)
+        if isinstance(layouts, np.ndarray):
+            out[:, :width] = layouts
+        else:
+            for index, layout in enumerate(layouts):
+                out[index, : len(layout)] = layout
+        return out
+
+    def _row_bytes(self, column):
+        width = (self.num_qubits or 0) if column == "layouts" else 1
+        return width * np.dtype(_COLUMNS[column]).itemsize
+
+    def _header(self, column):
+        shape = (self.num_rows,)
+        if column == "layouts":
+            shape = (self.num_rows, self.num_qubits or 0)
+        header = repr(
+            {
+                "descr": np.lib.format.dtype_to_descr(np.dtype(_COLUMNS[column])),
+                "fortran_order": False,
+                "shape": shape,
+            }
+        )
+        # Magic string, version and header length take 10 bytes
+        header = header.ljust(_HEADER_SIZE - 11) + "\n"
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode()
+
+
+class LayoutTable:
+    """Memory-mapped reader of a table written by ``LayoutTableWriter``.
+
+    Columns are read lazily from disk as they are indexed.
+
+    Parameters:
+        path (str): Directory of the table
+
+    Attributes:
+        layouts (memmap): Layouts padded with -1, one per row
+        backend_codes (memmap): Index into ``backends`` of each row
+        costs (memmap): Cost of each row
+        circuit_codes (memmap): Index into ``circuits`` of each row, -1 if
+                                the row has no circuit
+        backends (list): Backend names
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as fd:
+            meta = json.load(fd)
+        self.backends = meta["backends"]
+        self._meta = meta
+        num_rows = meta["num_rows"]
+        columns = {}
+        for column, dtype in _COLUMNS.items():
+            shape = (num_rows,)
+            if column == "layouts":
+                shape = (num_rows, meta["num_qubits"] or 0)
+            if num_rows:
+                columns[column] = np.memmap(
+                    os.path.join(path, column + ".npy"),
+                    dtype=dtype,
+                    mode="r",
+                    offset=_HEADER_SIZE,
+                    shape=shape,
+                )
+            else:
+                columns[column] = np.zeros(shape, dtype=dtype)
+        self.layouts = columns["layouts"]
+        self.backend_codes = columns["backends"]
+        self.costs = columns["costs"]
+        self.circuit_codes = columns["circuits"]
+        self._circuits = None
+
+    def __len__(self):
+        return self.costs.shape[0]
+
+    def __getitem__(self, index):
+        layout = self.layouts[index]
+        return (
+            layout[layout >= 0].tolist(),
+            self.backends[self.backend_codes[index]],
+            float(self.costs[index]),
+        )
+
+    def __iter__(self):
+        for start in range(0, len(self), DEFAULT_CHUNK_SIZE):
+            yield from self.rows(start, start + DEFAULT_CHUNK_SIZE)
+
+    @property
+    def circuits(self):
+        """Descriptions of the circuits, read on first use"""
+        if self._circuits is None:
+            with open(os.path.join(self.path, "circuits.jsonl"), "rb") as fd:
+                data = fd.read(self._meta["circuits_bytes"])
+            self._circuits = [json.loads(line) for line in data.splitlines()]
+        return self._circuits
+
+    def rows(self, start=0, stop=None):
+        """Rows of the table as tuples.
+
+        Parameters:
+            start (int): First row
+            stop (int): End row, default the end of the table
+
+        Returns:
+            list: Tuples of layout, backend name and cost
+        """
+        layouts = self.layouts[start:stop]
+        codes = self.backend_codes[start:stop]
+        costs = self.costs[start:stop]
+        return [
+            (layout[layout >= 0].tolist(), self.backends[code], cost)
+            for layout, code, cost in zip(layouts, codes.tolist(), costs.tolist())
+        ]
+
+
+def save_layouts(path, results, backend=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Save layout scores to a columnar table.
+
+    Parameters:
+        path (str): Directory of the table
+        results (list): Tuples of layout, backend name and cost, or of layout
+                        and cost
+        backend (str): Backend name of results without one
+        chunk_size (int): Number of rows written at a time
+    """
+    with LayoutTableWriter(path, chunk_size=chunk_size) as writer:
+        for start in range(0, len(results), chunk_size):
+            writer.write(results[start : start + chunk_size], backend=backend)
+
+
+def load_layouts(path):
+    """Open a columnar table of layout scores.
+
+    Parameters:
+        path (str): Directory of the table
+
+    Returns:
+        LayoutTable: Memory-mapped table
+    """
+    return LayoutTable(path)
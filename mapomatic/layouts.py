@@ -27,19 +27,47 @@
 # that they have been altered from the originals.
 
 """Circuit manipulation tools"""
+
+import heapq
+import itertools
+import math
 import random
+import sys
+
+import numpy as np
 
 from rustworkx import (
     PyGraph,
     PyDiGraph,
     vf2_mapping,
 )  # pylint:disable=no-name-in-module
-from qiskit.converters import circuit_to_dag
-from qiskit.transpiler.coupling import CouplingMap
-from qiskit.providers.backend import BackendV2
+
+from .approximate import approximate_layouts
+from .atlas import _coupling_map
+from .backends import BackendSnapshot
+from .export import DEFAULT_CHUNK_SIZE, LayoutTableWriter
+from .scoring import (
+    _SEARCH_IGNORE,
+    _supports_gates,
+    CircuitCounts,
+    ErrorTables,
+    log_fidelities,
+    log_fidelity_bound,
+    log_fidelity_terms,
+    pareto_front,
+)
+from .stats import current_stats
+
+# Metrics of evaluate_metrics, all smaller is better
+METRICS = ("error", "error_2q", "readout_error", "duration")
+
+# Relative slack when pruning backends by a bound on their cost
+_BOUND_RTOL = 1e-9
 
 
-def matching_layouts(circ, cmap, strict_direction=True, call_limit=int(3e7)):
+def matching_layouts(
+    circ, cmap, strict_direction=True, call_limit=int(3e7), atlas=None
+):
     """Matching for a circuit onto a given topology (coupling map)
 
     Parameters:
@@ -47,6 +75,10 @@ def matching_layouts(circ, cmap, strict_direction=True, call_limit=int(3e7)):
         cmap (list or CouplingMap or BackendV2): Coupling map or backend instance
         strict_direction (bool): Use directed coupling
         call_limit (int): Max number of calls to VF2 mapper
+        atlas (LayoutAtlas): Precomputed layouts for the coupling map, used
+                             instead of VF2 when the circuit is an atlas
+                             shape.  An atlas built for another coupling
+                             map is ignored
 
     Returns:
         list: Found mappings.
@@ -54,14 +86,86 @@ def matching_layouts(circ, cmap, strict_direction=True, call_limit=int(3e7)):
     Raises:
         TypeError: Invalid type passed to cmap
     """
-    if isinstance(cmap, list):
-        cmap = CouplingMap(cmap)
-    elif isinstance(cmap, CouplingMap):
-        pass
-    elif isinstance(cmap, BackendV2):
-        cmap = cmap.coupling_map
-    else:
-        raise TypeError("Invalid cmap input.")
+    cmap = _coupling_map(cmap)
+    stats = current_stats()
+    if atlas is not None:
+        with stats.stage("atlas"):
+            layouts = None
+            if atlas.matches(cmap):
+                layouts = atlas.layouts(circ, strict_direction=strict_direction)
+            else:
+                stats.flag("atlas_mismatch", True)
+        if layouts is not None:
+            stats.count("atlas_hits")
+            stats.count("layouts_found", len(layouts))
+            return layouts
+    with stats.stage("circuit_to_dag"):
+        problem = _vf2_problem(circ, cmap, strict_direction)
+    if problem is None:
+        return []
+
+    # VF2 calls the node matcher once per visited state, which is the
+    # quantity limited by call_limit
+    states = [0]
+
+    def count_states(*_):
+        states[0] += 1
+        return True
+
+    with stats.stage("vf2"):
+        layouts = list(
+            _iter_mappings(
+                circ,
+                problem,
+                call_limit,
+                node_matcher=count_states if stats.enabled else None,
+            )
+        )
+    if stats.enabled:
+        stats.count("vf2_calls")
+        stats.count("vf2_states", states[0])
+        stats.flag("call_limit_hit", call_limit is not None and states[0] > call_limit)
+        stats.count("layouts_found", len(layouts))
+        stats.count("layouts_unique", len({frozenset(layout) for layout in layouts}))
+    return layouts
+
+
+def iter_matching_layouts(circ, cmap, strict_direction=True, call_limit=int(3e7)):
+    """Matching for a circuit onto a given topology, yielding the layouts
+    one at a time as VF2 finds them rather than collecting them in a list.
+
+    Parameters:
+        circ (QuantumCircuit): Input quantum circuit
+        cmap (list or CouplingMap or BackendV2): Coupling map or backend instance
+        strict_direction (bool): Use directed coupling
+        call_limit (int): Max number of calls to VF2 mapper
+
+    Yields:
+        list: Found mappings
+
+    Raises:
+        TypeError: Invalid type passed to cmap
+    """
+    cmap = _coupling_map(cmap)
+    problem = _vf2_problem(circ, cmap, strict_direction)
+    if problem is not None:
+        yield from _iter_mappings(circ, problem, call_limit)
+
+
+def _vf2_problem(circ, cmap, strict_direction):
+    """Coupling and interaction graphs of a VF2 search.
+
+    Parameters:
+        circ (QuantumCircuit): Input quantum circuit
+        cmap (CouplingMap): Coupling map
+        strict_direction (bool): Use directed coupling
+
+    Returns:
+        tuple: Coupling graph, interaction graph, circuit qubits and
+        coupling graph node order, or None if the circuit cannot embed
+    """
+    # pylint: disable=import-outside-toplevel
+    from qiskit.converters import circuit_to_dag
 
     dag = circuit_to_dag(circ)
     qubits = dag.qubits
@@ -97,6 +201,14 @@ def matching_layouts(circ, cmap, strict_direction=True, call_limit=int(3e7)):
 
     im_graph.add_nodes_from(range(len(qubits)))
     im_graph.add_edges_from_no_data(interactions)
+    if not _may_embed(cm_graph, im_graph):
+        return None
+    return cm_graph, im_graph, qubits, cm_nodes
+
+
+def _iter_mappings(circ, problem, call_limit, node_matcher=None):
+    """Yield the layouts found by VF2 for the output of ``_vf2_problem``"""
+    cm_graph, im_graph, qubits, cm_nodes = problem
     # To avoid trying to over optimize the result by default limit the number
     # of trials based on the size of the graphs. For circuits with simple layouts
     # like an all 1q circuit we don't want to sit forever trying every possible
@@ -104,7 +216,6 @@ def matching_layouts(circ, cmap, strict_direction=True, call_limit=int(3e7)):
     # im_graph_edge_count = len(im_graph.edge_list())
     # cm_graph_edge_count = len(cm_graph.edge_list())
     # max_trials = max(im_graph_edge_count, cm_graph_edge_count) + 15
-
     mappings = vf2_mapping(
         cm_graph,
         im_graph,
@@ -112,8 +223,8 @@ def matching_layouts(circ, cmap, strict_direction=True, call_limit=int(3e7)):
         id_order=False,
         induced=False,
         call_limit=call_limit,
+        node_matcher=node_matcher,
     )
-    layouts = []
     for mapping in mappings:
         # Here we sort in the order that we would use
         # for intial layout
@@ -122,8 +233,36 @@ def matching_layouts(circ, cmap, strict_direction=True, call_limit=int(3e7)):
             key = qubits[im_i]
             val = cm_nodes[cm_i]
             temp_list[circ.find_bit(key).index] = val
-        layouts.append(temp_list)
-    return layouts
+        yield temp_list
+
+
+def _may_embed(cm_graph, im_graph):
+    """Cheap necessary conditions for the interaction graph to be a subgraph
+    of the coupling graph, used to skip hopeless VF2 searches.
+
+    Parameters:
+        cm_graph (PyGraph or PyDiGraph): Coupling graph
+        im_graph (PyGraph or PyDiGraph): Interaction graph
+
+    Returns:
+        bool: False if the interaction graph cannot be a subgraph
+    """
+    if im_graph.num_nodes() > cm_graph.num_nodes():
+        return False
+    if im_graph.num_edges() > cm_graph.num_edges():
+        return False
+
+    def degrees(graph):
+        if isinstance(graph, PyDiGraph):
+            graph = graph.to_undirected()
+        return sorted(
+            (len(set(graph.neighbors(node))) for node in graph.node_indexes()),
+            reverse=True,
+        )
+
+    return all(
+        im_deg <= cm_deg for im_deg, cm_deg in zip(degrees(im_graph), degrees(cm_graph))
+    )
 
 
 def unique_subsets(mappings):
@@ -157,22 +296,295 @@ def evaluate_layouts(circ, layouts, backend, cost_function=None):
     """
     if not any(layouts):
         return []
-    circuit_gates = set(circ.count_ops()).difference(
-        {"barrier", "reset", "measure", "delay"}
-    )
-    if not circuit_gates.issubset(backend.configuration().basis_gates):
-        return []
+    stats = current_stats()
+    with stats.stage("gate_check"):
+        if not _supports_gates(circ, backend.configuration()):
+            return []
     if not isinstance(layouts[0], list):
         layouts = [layouts]
     if cost_function is None:
         cost_function = default_cost
-    out = cost_function(circ, layouts, backend)
+    with stats.stage("scoring"):
+        out = cost_function(circ, layouts, backend)
+        out.sort(key=lambda x: x[1])
+    stats.count("layouts_scored", len(out))
+    return out
+
+
+def chunked_evaluate_layouts(
+    circ,
+    layouts,
+    backend,
+    cost_function=None,
+    top_k=None,
+    threshold=None,
+    max_rows=None,
+    max_bytes=None,
+    spill=None,
+):
+    """Evaluate layouts a chunk at a time under a memory ceiling.
+
+    The layouts, which may be a generator such as ``iter_matching_layouts``,
+    are passed to the cost function in chunks of at most ``max_rows`` layouts
+    or ``max_bytes`` bytes.  Only the best ``top_k`` layouts, and only those
+    with a cost of at most ``threshold``, are kept from one chunk to the
+    next, so peak memory does not grow with the number of layouts.  The
+    result is the same as filtering and truncating ``evaluate_layouts``.
+
+    Parameters:
+        circ (QuantumCircuit): circuit of interest
+        layouts (iterable): Specified layouts, as a list, array or generator
+        backend (IBMQBackend): An IBM Quantum backend instance
+        cost_function (callable): Custom cost function, default=None
+        top_k (int): Number of best layouts returned, default all
+        threshold (float): Largest cost returned, default=None
+        max_rows (int): Max number of layouts per chunk
+        max_bytes (int): Max estimated memory in bytes of a chunk.  With
+                         neither limit, chunks hold ``DEFAULT_CHUNK_SIZE``
+                         layouts
+        spill (str or LayoutTableWriter): Table directory, or open table
+                                          writer, that the scores of all
+                                          layouts are written to, default=None
+
+    Returns:
+        list: Tuples of layout and cost, sorted by cost
+    """
+    stats = current_stats()
+    with stats.stage("gate_check"):
+        if not _supports_gates(circ, backend.configuration()):
+            return []
+    if cost_function is None:
+        cost_function = default_cost
+    chunk_size = max_rows or DEFAULT_CHUNK_SIZE
+    if max_bytes is not None:
+        chunk_size = min(chunk_size, max_bytes // _layout_bytes(circ.num_qubits))
+    chunk_size = max(chunk_size, 1)
+    writer = spill
+    if isinstance(spill, str):
+        writer = LayoutTableWriter(spill, num_qubits=circ.num_qubits)
+    name = backend.configuration().backend_name
+    out = []
+    try:
+        for chunk in _chunks(layouts, chunk_size):
+            with stats.stage("scoring"):
+                scores = cost_function(circ, chunk, backend)
+            stats.count("layouts_scored", len(scores))
+            if writer is not None:
+                writer.write(scores, backend=name)
+            if threshold is not None:
+                scores = [item for item in scores if item[1] <= threshold]
+            out.extend(scores)
+            if top_k is not None and len(out) > top_k:
+                # Same as a stable sort and slice, so ties keep input order
+                out = heapq.nsmallest(top_k, out, key=lambda x: x[1])
+    finally:
+        if isinstance(spill, str):
+            writer.close()
+    out.sort(key=lambda x: x[1])
+    return out
+
+
+def _chunks(layouts, chunk_size):
+    """Yield lists of at most ``chunk_size`` layouts"""
+    if isinstance(layouts, np.ndarray):
+        if layouts.ndim == 1:
+            layouts = layouts.reshape(1, -1)
+        for start in range(0, layouts.shape[0], chunk_size):
+            yield layouts[start : start + chunk_size].tolist()
+        return
+    if isinstance(layouts, list) and layouts and not isinstance(layouts[0], list):
+        layouts = [layouts]
+    layouts = iter(layouts)
+    while True:
+        chunk = [list(layout) for layout in itertools.islice(layouts, chunk_size)]
+        if not chunk:
+            return
+        yield chunk
+
+
+def _layout_bytes(num_qubits):
+    """Estimated memory of one layout of a chunk: the list and its integers,
+    its row in the arrays of the default cost, and the result tuple"""
+    return sys.getsizeof([0] * num_qubits) + 36 * num_qubits + 80
+
+
+def evaluate_metrics(circ, layouts, backend, metrics=METRICS, pareto=False):
+    """Evaluate several metrics of the layouts on a backend in one pass.
+
+    The available metrics are ``error``, the error of the default cost
+    function, ``error_1q``, ``error_2q`` and ``readout_error``, its parts from
+    single qubit gates, two qubit gates and readout alone,
+    ``neg_log_fidelity``, the negative log-fidelity of the default cost
+    function, which still ranks deep circuits whose error rounds to 1, and
+    ``duration``, the circuit duration in sec when scheduled as soon as
+    possible.
+
+    Parameters:
+        circ (QuantumCircuit): circuit of interest
+        layouts (list): Specified layouts
+        backend (IBMQBackend): An IBM Quantum backend instance
+        metrics (tuple): Names of the metrics
+        pareto (bool): Return only the Pareto-optimal layouts, default=False
+
+    Returns:
+        tuple: The layouts and a ``(num_layouts, num_metrics)`` array of their
+        metrics.  Pareto-optimal layouts are sorted by the first metric.
+
+    Raises:
+        ValueError: Unknown metric
+    """
+    unknown = set(metrics).difference(
+        ("error", "error_1q", "neg_log_fidelity") + METRICS
+    )
+    if unknown:
+        raise ValueError("Unknown metrics {}".format(sorted(unknown)))
+    lays = np.asarray(layouts, dtype=int)
+    if lays.ndim == 1:
+        lays = lays.reshape(1, -1)
+    values = np.zeros((lays.shape[0], len(metrics)))
+    if not lays.size:
+        return [], values
+    stats = current_stats()
+    with stats.stage("gate_check"):
+        if not _supports_gates(circ, backend.configuration()):
+            return [], values[:0]
+    with stats.stage("properties"):
+        # Calibration data is fetched once for all metrics
+        snapshot = BackendSnapshot(backend)
+    with stats.stage("scoring"):
+        # Error terms are skipped when only durations are asked for
+        terms = {}
+        if set(metrics).difference({"duration"}):
+            terms = log_fidelity_terms(
+                CircuitCounts(circ), snapshot.error_tables(), lays
+            )
+        for col, metric in enumerate(metrics):
+            if metric == "duration":
+                schedule = _idle_schedule(circ)
+                durations, _ = _schedule_durations(
+                    schedule, lays, snapshot, snapshot.properties()
+                )
+                values[:, col] = _asap_duration(schedule, durations)
+            elif metric == "error":
+                values[:, col] = -np.expm1(terms["1q"] + terms["readout"] + terms["2q"])
+            elif metric == "neg_log_fidelity":
+                values[:, col] = -(terms["1q"] + terms["readout"] + terms["2q"])
+            elif metric == "readout_error":
+                values[:, col] = -np.expm1(terms["readout"])
+            else:
+                values[:, col] = -np.expm1(terms[metric[-2:]])
+    stats.count("layouts_scored", lays.shape[0])
+    if pareto:
+        front = pareto_front(values)
+        lays = lays[front]
+        values = values[front]
+    return lays.tolist(), values
+
+
+def reevaluate_layouts(
+    circ, scores, backend, old_calibration, cost_function=None, rtol=0, atol=0
+):
+    """Re-evaluate scored layouts after the calibration of a backend changes.
+
+    Only layouts that use a qubit or edge whose calibration data changed
+    are passed to the cost function again.  All other layouts keep their
+    previous cost.
+
+    Parameters:
+        circ (QuantumCircuit): circuit of interest
+        scores (list): Tuples of layout and cost, as from ``evaluate_layouts``
+        backend (IBMQBackend): Backend instance with the new calibration data
+        old_calibration (dict): Output of ``calibration_table`` for the data
+                                the scores were computed with
+        cost_function (callable): Custom cost function, default=None
+        rtol (float): Relative tolerance below which a change is ignored
+        atol (float): Absolute tolerance below which a change is ignored
+
+    Returns:
+        list: Tuples of layout and cost, sorted by cost
+    """
+    if not any(scores):
+        return []
+    if cost_function is None:
+        cost_function = default_cost
+    qubits, edges = calibration_changes(
+        old_calibration, calibration_table(backend), rtol=rtol, atol=atol
+    )
+    lays = np.asarray([layout for layout, _ in scores], dtype=int)
+    touched = np.isin(lays, list(qubits)).any(axis=1)
+    for edge in edges:
+        touched |= np.all([(lays == qubit).any(axis=1) for qubit in edge], axis=0)
+
+    out = [item for item, stale in zip(scores, touched) if not stale]
+    stale_layouts = [item[0] for item, stale in zip(scores, touched) if stale]
+    if stale_layouts:
+        out.extend(cost_function(circ, stale_layouts, backend))
     out.sort(key=lambda x: x[1])
     return out
 
 
+def calibration_table(backend):
+    """Snapshot of the calibration data of a backend used for scoring layouts.
+
+    Parameters:
+        backend (IBMQBackend): An IBM Quantum backend instance
+
+    Returns:
+        dict: Values keyed by ``(name, qubits, parameter)`` for the error and
+        length of every gate, and for the T1, T2, readout error and readout
+        length of every qubit.
+    """
+    with current_stats().stage("properties"):
+        props = backend.properties()
+    table = {}
+    for gate in props.gates:
+        qubits = tuple(gate.qubits)
+        for param in gate.parameters:
+            if param.name in ["gate_error", "gate_length"]:
+                table[(gate.gate, qubits, param.name)] = param.value
+    for qubit, qubit_props in enumerate(props.qubits):
+        for param in qubit_props:
+            if param.name in ["T1", "T2", "readout_error", "readout_length"]:
+                table[("qubit", (qubit,), param.name)] = param.value
+    return table
+
+
+def calibration_changes(old_table, new_table, rtol=0, atol=0):
+    """Qubits and edges whose calibration data differs between two tables.
+
+    Parameters:
+        old_table (dict): Output of ``calibration_table``
+        new_table (dict): Output of ``calibration_table``
+        rtol (float): Relative tolerance below which a change is ignored
+        atol (float): Absolute tolerance below which a change is ignored
+
+    Returns:
+        tuple: Set of changed qubits and set of changed edges (as tuples)
+    """
+    qubits = set()
+    edges = set()
+    for key in set(old_table).union(new_table):
+        old = old_table.get(key)
+        new = new_table.get(key)
+        if old is not None and new is not None:
+            if math.isclose(old, new, rel_tol=rtol, abs_tol=atol):
+                continue
+        if len(key[1]) == 1:
+            qubits.add(key[1][0])
+        else:
+            edges.add(key[1])
+    return qubits, edges
+
+
 def best_overall_layout(
-    circ, backends, successors=False, call_limit=int(3e7), cost_function=None
+    circ,
+    backends,
+    successors=False,
+    call_limit=int(3e7),
+    cost_function=None,
+    approximate=False,
+    time_budget=1.0,
+    prune=True,
 ):
     """Find the best selection of qubits and system to run
     the chosen circuit one.
@@ -183,37 +595,42 @@ def best_overall_layout(
         successors (bool): Return list best mappings per backend passed.
         call_limit (int): Maximum number of calls to VF2 mapper.
         cost_function (callable): Custom cost function, default=None
+        approximate (bool): Fall back to ``approximate_layouts`` on backends
+                            without an exact match, default=False.  Only
+                            available with ``default_cost`` and
+                            ``default_log_cost``, whose scale the estimate
+                            is given in
+        time_budget (float): Time in sec for each approximate search
+        prune (bool): Skip backends whose lower bound on the cost exceeds
+                      the best cost found so far.  Only applies to the
+                      built-in cost functions without ``successors`` or
+                      ``approximate``, and does not change the result,
+                      default=True
 
     Returns:
         tuple: (best_layout, best_backend, best_error)
         list: List of tuples for best match for each backend
+
+    Raises:
+        ValueError: ``approximate`` with a cost function other than
+                    ``default_cost`` or ``default_log_cost``
     """
     if not isinstance(backends, list):
         backends = [backends]
 
     if cost_function is None:
         cost_function = default_cost
+    _check_approximate(cost_function, approximate)
 
-    best_out = []
-
-    circ_qubits = circ.num_qubits
-    for backend in backends:
-        config = backend.configuration()
-        circuit_gates = set(circ.count_ops()).difference(
-            {"barrier", "reset", "measure"}
-        )
-        if not circuit_gates.issubset(backend.configuration().basis_gates):
-            continue
-        num_qubits = config.num_qubits
-        if not config.simulator and circ_qubits <= num_qubits:
-            layouts = matching_layouts(circ, config.coupling_map, call_limit=call_limit)
-            layout_and_error = evaluate_layouts(
-                circ, layouts, backend, cost_function=cost_function
-            )
-            if any(layout_and_error):
-                layout = layout_and_error[0][0]
-                error = layout_and_error[0][1]
-                best_out.append((layout, config.backend_name, error))
+    best_out = _search_backends(
+        circ,
+        backends,
+        lambda backend: _best_layout(
+            circ, backend, call_limit, cost_function, approximate, time_budget
+        ),
+        cost_function,
+        prune and not successors and not approximate,
+    )
     best_out.sort(key=lambda x: x[2])
     if successors:
         return best_out
@@ -222,6 +639,150 @@ def best_overall_layout(
     return best_out
 
 
+def _search_backends(circ, backends, search, cost_function, prune):
+    """Best layouts of a circuit on several backends.
+
+    With ``prune``, backends are searched in order of a lower bound on the
+    cost of their layouts, and once a layout is found, backends whose bound
+    exceeds its cost are skipped.  A skipped backend cannot have a layout
+    with a lower or equal cost, so the best result is unchanged.  The
+    calibration data fetched for the bound is reused by the search.
+
+    Parameters:
+        circ (QuantumCircuit): Quantum circuit
+        backends (list): Backend instances
+        search (callable): Called with a backend, or a snapshot of it,
+                           returning the output of ``_best_layout``
+        cost_function (callable): Cost function
+        prune (bool): Skip backends that cannot beat the best cost
+
+    Returns:
+        list: Best layout of each searched backend with one, in the order
+        of ``backends``
+    """
+    if not prune or cost_function not in _BOUNDED_COSTS:
+        found = [search(backend) for backend in backends]
+        return [best for best in found if best is not None]
+    stats = current_stats()
+    counts = CircuitCounts(circ)
+    bounds = []
+    snapshots = []
+    for backend in backends:
+        with stats.backend(backend), stats.stage("bound"):
+            bound, snapshot = _cost_bound(circ, counts, backend, cost_function)
+        bounds.append(bound)
+        snapshots.append(snapshot)
+    # Backends without a bound cannot run the circuit and are rejected quickly
+    order = sorted(
+        range(len(backends)),
+        key=lambda idx: (bounds[idx] is not None, bounds[idx] or 0),
+    )
+    found = []
+    incumbent = math.inf
+    for idx in order:
+        # Leave room for rounding differences between bound and cost
+        if bounds[idx] is not None and bounds[idx] - incumbent > _BOUND_RTOL * max(
+            incumbent, 1.0
+        ):
+            with stats.backend(backends[idx]):
+                stats.flag("pruned", True)
+            continue
+        best = search(snapshots[idx])
+        if best is not None:
+            found.append((idx, best))
+            incumbent = min(incumbent, best[2])
+    found.sort(key=lambda x: x[0])
+    return [best for _, best in found]
+
+
+def _cost_bound(circ, counts, backend, cost_function):
+    """Lower bound on the cost of any layout of a circuit on a backend.
+
+    Parameters:
+        circ (QuantumCircuit): Quantum circuit
+        counts (CircuitCounts): Operation counts of the circuit
+        backend (IBMQBackend): An IBM Quantum backend instance
+        cost_function (callable): One of the built-in cost functions
+
+    Returns:
+        tuple: Lower bound, or None if the circuit cannot run on the backend,
+        and a ``BackendSnapshot`` holding the calibration data fetched for the
+        bound, or the backend itself if none was fetched
+    """
+    config = backend.configuration()
+    if not _supports_gates(circ, config, ignore=_SEARCH_IGNORE):
+        return None, backend
+    if config.simulator or circ.num_qubits > config.num_qubits:
+        return None, backend
+    with current_stats().stage("properties"):
+        if not isinstance(backend, BackendSnapshot):
+            backend = BackendSnapshot(backend, configuration=config)
+        tables = backend.error_tables()
+    log_fid = log_fidelity_bound(counts, tables)
+    if _BOUNDED_COSTS[cost_function]:
+        return -log_fid, backend
+    return -math.expm1(log_fid), backend
+
+
+def _best_layout(
+    circ,
+    backend,
+    call_limit,
+    cost_function,
+    approximate,
+    time_budget,
+    coupling_map=None,
+    atlas=None,
+):
+    """Best layout of a circuit on a single backend.
+
+    Parameters:
+        circ (QuantumCircuit): Quantum circuit
+        backend (IBMQBackend): An IBM Quantum backend instance
+        call_limit (int): Maximum number of calls to VF2 mapper.
+        cost_function (callable): Cost function
+        approximate (bool): Fall back to ``approximate_layouts``
+        time_budget (float): Time in sec for the approximate search
+        coupling_map (CouplingMap): Prebuilt coupling map of the backend,
+                                    default=None
+        atlas (LayoutAtlas): Precomputed layouts for the coupling map,
+                             default=None
+
+    Returns:
+        tuple: (best_layout, backend_name, best_error), or None if the
+        circuit cannot run on the backend
+    """
+    stats = current_stats()
+    with stats.backend(backend):
+        with stats.stage("configuration"):
+            config = backend.configuration()
+        with stats.stage("gate_check"):
+            if not _supports_gates(circ, config, ignore=_SEARCH_IGNORE):
+                return None
+        if config.simulator or circ.num_qubits > config.num_qubits:
+            return None
+        if coupling_map is None:
+            coupling_map = config.coupling_map
+        layouts = matching_layouts(
+            circ, coupling_map, call_limit=call_limit, atlas=atlas
+        )
+        layout_and_error = evaluate_layouts(
+            circ, layouts, backend, cost_function=cost_function
+        )
+        if approximate and not layouts:
+            with stats.stage("approximate"):
+                layout_and_error = approximate_layouts(
+                    circ,
+                    backend,
+                    num_layouts=1,
+                    time_budget=time_budget,
+                    log_cost=_APPROXIMATE_COSTS[cost_function],
+                )
+        if not any(layout_and_error):
+            return None
+        return (layout_and_error[0][0], config.backend_name, layout_and_error[0][1])
+
+
 def default_cost(circ, layouts, backend):
     """The default mapomatic cost function that returns the total
     error rate over all the layouts for the gates in the given circuit
@@ -234,26 +795,364 @@ def default_cost(circ, layouts, backend):
     Returns:
         list: Tuples of layout and error
     """
-    out = []
-    # Make a single layout nested
-    props = backend.properties()
-    for layout in layouts:
-        error = 0
-        fid = 1
-        for item in circ._data:
-            if item[0].num_qubits == 2 and item[0].name != "barrier":
-                q0 = circ.find_bit(item[1][0]).index
-                q1 = circ.find_bit(item[1][1]).index
-                fid *= 1 - props.gate_error(item[0].name, [layout[q0], layout[q1]])
-
-            elif item[0].name in ["sx", "x"]:
-                q0 = circ.find_bit(item[1][0]).index
-                fid *= 1 - props.gate_error(item[0].name, layout[q0])
-
-            elif item[0].name in ["measure", "reset"]:
-                q0 = circ.find_bit(item[1][0]).index
-                fid *= 1 - props.readout_error(layout[q0])
-
-        error = 1 - fid
-        out.append((layout, error))
-    return out
+    log_fids = _default_log_fidelities(circ, layouts, backend)
+    return list(zip(layouts, (-np.expm1(log_fids)).tolist()))
+
+
+def default_log_cost(circ, layouts, backend):
+    """Negative log-fidelity of the default cost function.
+
+    Ranks layouts the same as ``default_cost``, but keeps them apart for
+    deep circuits whose error rounds to 1.
+
+    Parameters:
+        circ (QuantumCircuit): circuit of interest
+        layouts (list of lists): List of specified layouts
+        backend (IBMQBackend): An IBM Quantum backend instance
+
+    Returns:
+        list: Tuples of layout and negative log-fidelity
+    """
+    log_fids = _default_log_fidelities(circ, layouts, backend)
+    return list(zip(layouts, (-log_fids).tolist()))
+
+
+def decoherence_cost(circ, layouts, backend):
+    """A cost function that adds T1 and T2 errors accrued during idle periods
+    to the gate and readout errors of the default cost function.
+
+    The circuit is scheduled (ALAP) once per call, with the instruction
+    dependencies and the per-qubit idle intervals shared by all layouts.  Only
+    the gate durations and T1/T2 values of each layout are swapped in, so no
+    call to ``transpile`` is made.
+
+    Parameters:
+        circ (QuantumCircuit): circuit of interest
+        layouts (list of lists): List of specified layouts
+        backend (IBMQBackend): An IBM Quantum backend instance
+
+    Returns:
+        list: Tuples of layout and cost
+    """
+    log_fids = _decoherence_log_fidelities(circ, layouts, backend)
+    return list(zip(layouts, (-np.expm1(log_fids)).tolist()))
+
+
+def decoherence_log_cost(circ, layouts, backend):
+    """Negative log-fidelity of the decoherence cost function.
+
+    Parameters:
+        circ (QuantumCircuit): circuit of interest
+        layouts (list of lists): List of specified layouts
+        backend (IBMQBackend): An IBM Quantum backend instance
+
+    Returns:
+        list: Tuples of layout and negative log-fidelity
+    """
+    log_fids = _decoherence_log_fidelities(circ, layouts, backend)
+    return list(zip(layouts, (-log_fids).tolist()))
+
+
+# Built-in cost functions with a lower bound used to prune backends, mapped
+# to whether they are in the log domain
+_BOUNDED_COSTS = {
+    default_cost: False,
+    decoherence_cost: False,
+    default_log_cost: True,
+    decoherence_log_cost: True,
+}
+
+
+# Cost functions the approximate fallback can estimate, mapped to whether
+# they are in the log domain
+_APPROXIMATE_COSTS = {default_cost: False, default_log_cost: True}
+
+
+def _check_approximate(cost_function, approximate):
+    """Raise if the approximate fallback cannot score on the scale of a
+    cost function.
+
+    Parameters:
+        cost_function (callable): Cost function
+        approximate (bool): Whether the approximate fallback is used
+
+    Raises:
+        ValueError: ``approximate`` with an unsupported cost function
+    """
+    if approximate and cost_function not in _APPROXIMATE_COSTS:
+        raise ValueError(
+            "approximate=True needs default_cost or default_log_cost, as the "
+            "estimate of approximate_layouts has no idle or custom terms"
+        )
+
+
+def _default_log_fidelities(circ, layouts, backend, props=None):
+    """Log-fidelity of the gates and readout of every layout.
+
+    Parameters:
+        circ (QuantumCircuit): circuit of interest
+        layouts (list of lists): List of specified layouts
+        backend (IBMQBackend): An IBM Quantum backend instance
+        props (BackendProperties): Calibration data already fetched from
+                                   the backend, default=None
+
+    Returns:
+        ndarray: Log-fidelity of each layout
+
+    Raises:
+        ValueError: A layout uses a gate without calibration data
+    """
+    with current_stats().stage("properties"):
+        tables = _error_tables(backend, props=props)
+    if len(layouts) == 0:
+        return np.zeros(0)
+    lays = np.asarray(layouts, dtype=int).reshape(len(layouts), -1)
+    log_fids = log_fidelities(CircuitCounts(circ), tables, lays)
+    missing = np.flatnonzero(np.isnan(log_fids))
+    if missing.size:
+        raise ValueError(
+            "No calibration data for the gates of layout {}".format(
+                lays[missing[0]].tolist()
+            )
+        )
+    return log_fids
+
+
+def _error_tables(backend, props=None):
+    """Error tables of a backend, reusing those cached by a snapshot.
+
+    Parameters:
+        backend (IBMQBackend): An IBM Quantum backend instance
+        props (BackendProperties): Calibration data already fetched from
+                                   the backend, default=None
+
+    Returns:
+        ErrorTables: Error tables of the backend
+    """
+    if isinstance(backend, BackendSnapshot):
+        return backend.error_tables()
+    return ErrorTables.from_backend(backend, props=props)
+
+
+def _decoherence_log_fidelities(circ, layouts, backend):
+    """Log-fidelity of the gates, readout and idle periods of every layout.
+
+    Parameters:
+        circ (QuantumCircuit): circuit of interest
+        layouts (list of lists): List of specified layouts
+        backend (IBMQBackend): An IBM Quantum backend instance
+
+    Returns:
+        ndarray: Log-fidelity of each layout
+    """
+    with current_stats().stage("properties"):
+        props = backend.properties()
+    num_qubits = backend.configuration().num_qubits
+    schedule = _idle_schedule(circ)
+    lays = np.asarray(layouts, dtype=int)
+    durations, virtual = _schedule_durations(schedule, lays, backend, props)
+
+    t1s = np.full(num_qubits, np.inf)
+    t2s = np.full(num_qubits, np.inf)
+    for qubit in range(num_qubits):
+        qubit_props = props.qubit_property(qubit)
+        if "T1" in qubit_props:
+            t1s[qubit] = qubit_props["T1"][0]
+        if "T2" in qubit_props:
+            t2s[qubit] = qubit_props["T2"][0]
+
+    # ASAP pass for the circuit duration, then ALAP for the start times
+    total = _asap_duration(schedule, durations)
+    start = np.zeros_like(durations)
+    for idx in reversed(range(durations.shape[1])):
+        succs = schedule["succs"][idx]
+        end = np.min(start[:, succs], axis=1) if succs else total
+        start[:, idx] = end - durations[:, idx]
+    finish = start + durations
+
+    log_fids = _default_log_fidelities(circ, layouts, backend, props=props)
+    for qubit, events in enumerate(schedule["wires"]):
+        # A qubit sits in its ground state until its first physical operation
+        first = next(
+            (
+                pos
+                for pos, idx in enumerate(events)
+                if schedule["ops"][idx][0] not in virtual | {"barrier"}
+            ),
+            len(events),
+        )
+        events = events[first:]
+        if len(events) < 2:
+            continue
+        gaps = start[:, events[1:]] - finish[:, events[:-1]]
+        phys = lays[:, qubit][:, None]
+        with np.errstate(divide="ignore"):
+            log_fids += np.sum(
+                np.log1p(-idle_error(np.clip(gaps, 0, None), t1s[phys], t2s[phys])),
+                axis=1,
+            )
+    return log_fids
+
+
+def idle_error(time, t1, t2):
+    """Compute the approx. idle error from T1 and T2
+
+    Parameters:
+        time (float or ndarray): Delay time in sec
+        t1 (float or ndarray): T1 time in sec
+        t2 (float or ndarray): T2 time in sec
+
+    Returns:
+        float or ndarray: Idle error
+    """
+    t2 = np.minimum(t1, t2)
+    rate1 = 1 / t1
+    rate2 = 1 / t2
+    p_reset = 1 - np.exp(-time * rate1)
+    p_z = (1 - p_reset) * (1 - np.exp(-time * (rate2 - rate1))) / 2
+    return p_z + p_reset
+
+
+def _idle_schedule(circ):
+    """Layout independent scheduling structure of a circuit.
+
+    Parameters:
+        circ (QuantumCircuit): circuit of interest
+
+    Returns:
+        dict: Instructions as ``(name, qubits, delay)`` tuples, the
+        predecessors and successors of each instruction, and the sequence
+        of non-delay instructions on each qubit.
+    """
+    ops = []
+    preds = []
+    succs = []
+    wires = [[] for _ in range(circ.num_qubits)]
+    last = {}
+    for item in circ._data:
+        name = item[0].name
+        qargs = tuple(circ.find_bit(qubit).index for qubit in item[1])
+        cargs = tuple(circ.num_qubits + circ.find_bit(clbit).index for clbit in item[2])
+        delay = (item[0].duration, item[0].unit) if name == "delay" else None
+        idx = len(ops)
+        ops.append((name, qargs, delay))
+        prev = sorted({last[wire] for wire in qargs + cargs if wire in last})
+        preds.append(prev)
+        succs.append([])
+        for pred in prev:
+            succs[pred].append(idx)
+        for wire in qargs + cargs:
+            last[wire] = idx
+        if name != "delay":
+            for qubit in qargs:
+                wires[qubit].append(idx)
+    return {"ops": ops, "preds": preds, "succs": succs, "wires": wires}
+
+
+def _schedule_durations(schedule, lays, backend, props):
+    """Per-layout durations of the instructions of a schedule.
+
+    Parameters:
+        schedule (dict): Output of ``_idle_schedule``
+        lays (ndarray): Layouts, one per row
+        backend (IBMQBackend): An IBM Quantum backend instance
+        props (BackendProperties): Calibration data of the backend
+
+    Returns:
+        tuple: Durations in sec as a ``(num_layouts, num_instructions)``
+        array, and the names of the gates of zero duration on every qubit
+    """
+    dt = backend.configuration().dt
+    lengths, virtual = _gate_lengths(backend, props)
+
+    # Gathered once per distinct (name, qubits) pair in the circuit
+    durations = np.zeros((lays.shape[0], len(schedule["ops"])))
+    columns = {}
+    for idx, (name, qargs, duration) in enumerate(schedule["ops"]):
+        if duration is not None:
+            durations[:, idx] = _delay_seconds(duration, dt)
+            continue
+        key = (name, qargs)
+        if key not in columns:
+            if name == "measure":
+                table = lengths["readout"]
+            else:
+                table = lengths.get("{}q:{}".format(len(qargs), name))
+            if table is None:
+                columns[key] = 0
+            else:
+                columns[key] = table[tuple(lays[:, qubit] for qubit in qargs)]
+        durations[:, idx] = columns[key]
+    return durations, virtual
+
+
+def _gate_lengths(backend, props):
+    """Gate and readout lengths of a backend as dense arrays.
+
+    Parameters:
+        backend (IBMQBackend): An IBM Quantum backend instance
+        props (BackendProperties): Calibration data of the backend
+
+    Returns:
+        tuple: Lengths in sec keyed like ``ErrorTables.arrays``, zero where
+        there is no calibration data, and the names of the gates of zero
+        duration on every qubit
+    """
+    num_qubits = backend.configuration().num_qubits
+    lengths = {}
+    names = set()
+    timed = set()
+    for gate in props.gates:
+        value = props.gate_length(gate.gate, gate.qubits)
+        names.add(gate.gate)
+        if value:
+            timed.add(gate.gate)
+        if len(gate.qubits) not in [1, 2]:
+            continue
+        key = "{}q:{}".format(len(gate.qubits), gate.gate)
+        if key not in lengths:
+            lengths[key] = np.zeros((num_qubits,) * len(gate.qubits))
+        lengths[key][tuple(gate.qubits)] = value
+    readout = np.zeros(num_qubits)
+    for qubit in range(num_qubits):
+        qubit_props = props.qubit_property(qubit)
+        if "readout_length" in qubit_props:
+            readout[qubit] = qubit_props["readout_length"][0]
+    lengths["readout"] = readout
+    return lengths, names.difference(timed)
+
+
+def _asap_duration(schedule, durations):
+    """Duration of an ASAP schedule for every layout.
+
+    Parameters:
+        schedule (dict): Output of ``_idle_schedule``
+        durations (ndarray): Output of ``_schedule_durations``
+
+    Returns:
+        ndarray: Circuit duration in sec of each layout
+    """
+    finish = np.zeros_like(durations)
+    for idx, preds in enumerate(schedule["preds"]):
+        start = np.max(finish[:, preds], axis=1) if preds else 0
+        finish[:, idx] = start + durations[:, idx]
+    if not durations.shape[1]:
+        return np.zeros(durations.shape[0])
+    return finish.max(axis=1)
+
+
+def _delay_seconds(delay, dt):
+    """Convert a delay duration to seconds.
+
+    Parameters:
+        delay (tuple): Duration and unit of the delay
+        dt (float): Backend sample time in sec
+
+    Returns:
+        float: Delay time in sec
+    """
+    duration, unit = delay
+    if unit == "dt":
+        return duration * dt
+    scale = {"s": 1, "ms": 1e-3, "us": 1e-6, "ns": 1e-9, "ps": 1e-12}
+    return duration * scale[unit]
@@ -0,0 +1,197 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Process-parallel layout scoring over shared memory"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .scoring import CircuitCounts, ErrorTables, _supports_gates, log_fidelities
+from .stats import current_stats
+
+# Shared arrays and circuit counts of a worker process
+_WORKER_STATE = {}
+
+# Largest number of layouts scored in one task
+MAX_CHUNK_SIZE = 2**16
+
+
+def parallel_evaluate_layouts(
+    circ, layouts, backend, top_k=None, processes=None, chunk_size=None, log_cost=False
+):
+    """Score layouts with the default cost function in worker processes.
+
+    The layout matrix and the error tables of the backend are written once
+    to shared memory, and workers score disjoint chunks of its rows in place
+    rather than receiving pickled copies of the backend, circuit and layouts.
+    With ``top_k`` each worker returns only the best layouts of its chunks,
+    which are reduced into the global ``top_k``.
+
+    Parameters:
+        circ (QuantumCircuit): circuit of interest
+        layouts (list or ndarray): Specified layouts
+        backend (IBMQBackend): An IBM Quantum backend instance
+        top_k (int): Number of best layouts returned, default all
+        processes (int): Number of worker processes, default the CPU count
+        chunk_size (int): Number of layouts per task, default balances the
+                          layouts over four tasks per process
+        log_cost (bool): Return the negative log-fidelity instead of the
+                         error, as ``default_log_cost``, default=False
+
+    Returns:
+        list: Tuples of layout and cost, sorted by cost, ties in the order
+        of ``layouts``
+
+    Raises:
+        ValueError: A layout uses gates without calibration data
+    """
+    layouts = np.asarray(layouts, dtype=np.int32)
+    if not layouts.size:
+        return []
+    if layouts.ndim == 1:
+        layouts = layouts.reshape(1, -1)
+    stats = current_stats()
+    with stats.stage("gate_check"):
+        if not _supports_gates(circ, backend.configuration()):
+            return []
+    if processes is None:
+        processes = os.cpu_count() or 1
+    num_layouts = layouts.shape[0]
+    if top_k is None or top_k > num_layouts:
+        top_k = num_layouts
+    if chunk_size is None:
+        chunk_size = min(math.ceil(num_layouts / (4 * processes)), MAX_CHUNK_SIZE)
+    with stats.stage("properties"):
+        tables = ErrorTables.from_backend(backend)
+    counts = CircuitCounts(circ)
+    with stats.stage("scoring"):
+        arrays = {"layouts": layouts}
+        for key, value in tables.arrays.items():
+            arrays["error:" + key] = value
+        for key, value in tables.log_arrays.items():
+            arrays["log:" + key] = value
+        shm, spec = _share(arrays)
+        try:
+            initargs = (shm.name, spec, tables.name, counts)
+            starts = range(0, num_layouts, chunk_size)
+            if processes == 1:
+                _init_worker(*initargs)
+                results = [_score_rows(start, chunk_size, top_k) for start in starts]
+                _close_worker()
+                rows, log_fids = _top_rows(results, top_k)
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=processes,
+                    initializer=_init_worker,
+                    initargs=initargs,
+                ) as executor:
+                    rows, log_fids = _top_rows(
+                        executor.map(
+                            _score_rows,
+                            starts,
+                            [chunk_size] * len(starts),
+                            [top_k] * len(starts),
+                        ),
+                        top_k,
+                    )
+        finally:
+            shm.close()
+            shm.unlink()
+    stats.count("layouts_scored", num_layouts)
+    costs = -log_fids if log_cost else -np.expm1(log_fids)
+    return list(zip(layouts[rows].tolist(), costs.tolist()))
+
+
+def _top_rows(results, top_k):
+    """Reduce the best rows of each chunk into the global best rows"""
+    rows = np.zeros(0, dtype=np.intp)
+    log_fids = np.zeros(0)
+    for chunk_rows, chunk_log_fids in results:
+        rows = np.concatenate([rows, chunk_rows])
+        log_fids = np.concatenate([log_fids, chunk_log_fids])
+        if rows.size > 2 * top_k:
+            rows, log_fids = _best(rows, log_fids, top_k)
+    return _best(rows, log_fids, top_k)
+
+
+def _best(rows, log_fids, top_k):
+    """The ``top_k`` rows of highest log-fidelity, ties broken by row"""
+    order = np.lexsort((rows, -log_fids))[:top_k]
+    return rows[order], log_fids[order]
+
+
+def _share(arrays):
+    """Copy arrays into one shared memory block.
+
+    Returns:
+        tuple: The shared memory and the ``(key, dtype, shape, offset)``
+        of each array in it
+    """
+    spec = []
+    size = 0
+    for key, value in arrays.items():
+        spec.append((key, value.dtype.str, value.shape, size))
+        # Keep every array aligned to a cache line
+        size += -(-value.nbytes // 64) * 64
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for (key, dtype, shape, offset), value in zip(spec, arrays.values()):
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[...] = value
+    return shm, spec
+
+
+def _attach(shm, spec):
+    """Views of the arrays in a shared memory block"""
+    return {
+        key: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        for key, dtype, shape, offset in spec
+    }
+
+
+def _init_worker(name, spec, backend_name, counts):
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = _attach(shm, spec)
+    tables = ErrorTables(
+        backend_name,
+        {key[6:]: value for key, value in arrays.items() if key.startswith("error:")},
+        {key[4:]: value for key, value in arrays.items() if key.startswith("log:")},
+    )
+    _WORKER_STATE.update(
+        shm=shm, layouts=arrays["layouts"], tables=tables, counts=counts
+    )
+
+
+def _close_worker():
+    """Drop the views of the shared memory, then detach from it"""
+    shm = _WORKER_STATE["shm"]
+    _WORKER_STATE.clear()
+    shm.close()
+
+
+def _score_rows(start, chunk_size, top_k):
+    """Score a chunk of the shared layout matrix, returning its best rows"""
+    layouts = _WORKER_STATE["layouts"][start : start + chunk_size]
+    log_fids = log_fidelities(_WORKER_STATE["counts"], _WORKER_STATE["tables"], layouts)
+    missing = np.flatnonzero(np.isnan(log_fids))
+    if missing.size:
+        raise ValueError(
+            "No calibration data for the gates of layout {}".format(
+                layouts[missing[0]].tolist()
+            )
+        )
+    rows = np.arange(start, start + layouts.shape[0])
+    if top_k < rows.size:
+        rows, log_fids = _best(rows, log_fids, top_k)
+    return rows, log_fids
@@ -0,0 +1,248 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Vectorized scoring of layout matrices"""
+
+import numpy as np
+
+# Operations that need not be basis gates to score a circuit
+_SCORED_IGNORE = ("barrier", "reset", "measure", "delay")
+
+# Operations that need not be basis gates to search a backend for layouts
+_SEARCH_IGNORE = ("barrier", "reset", "measure")
+
+
+class ErrorTables:
+    """Calibration data of a backend as dense arrays indexed by physical qubit.
+
+    Single qubit gate errors are arrays of length ``num_qubits`` and two
+    qubit gate errors are ``num_qubits x num_qubits`` matrices.  Entries
+    without calibration data are NaN.
+
+    Parameters:
+        name (str): Backend name
+        arrays (dict): Error arrays keyed by ``"1q:<gate>"``, ``"2q:<gate>"``
+                       and ``"readout"``
+        log_arrays (dict): The arrays as ``log(1 - error)``, computed if None
+
+    Attributes:
+        name (str): Backend name
+        arrays (dict): Error arrays
+        log_arrays (dict): Log-fidelity arrays
+    """
+
+    def __init__(self, name, arrays, log_arrays=None):
+        self.name = name
+        self.arrays = arrays
+        if log_arrays is None:
+            with np.errstate(divide="ignore"):
+                log_arrays = {key: np.log1p(-value) for key, value in arrays.items()}
+        self.log_arrays = log_arrays
+
+    @classmethod
+    def from_backend(cls, backend, props=None):
+        """Build the tables from the calibration data of a backend.
+
+        Parameters:
+            backend (IBMQBackend): An IBM Quantum backend instance
+            props (BackendProperties): Calibration data already fetched from
+                                       the backend, default=None
+
+        Returns:
+            ErrorTables: Error tables of the backend
+        """
+        config = backend.configuration()
+        if props is None:
+            props = backend.properties()
+        num_qubits = config.num_qubits
+        arrays = {}
+        for gate in props.gates:
+            error = None
+            for param in gate.parameters:
+                if param.name == "gate_error":
+                    error = param.value
+            if error is None or len(gate.qubits) not in [1, 2]:
+                continue
+            key = "{}q:{}".format(len(gate.qubits), gate.gate)
+            if key not in arrays:
+                shape = (num_qubits,) * len(gate.qubits)
+                arrays[key] = np.full(shape, np.nan)
+            arrays[key][tuple(gate.qubits)] = error
+        readout = np.full(num_qubits, np.nan)
+        for qubit, qubit_props in enumerate(props.qubits[:num_qubits]):
+            for item in qubit_props:
+                if item.name == "readout_error":
+                    readout[qubit] = item.value
+        arrays["readout"] = readout
+        return cls(config.backend_name, arrays)
+
+
+class CircuitCounts:
+    """The operations of a circuit that enter the default cost, counted per
+    gate and logical qubits.
+
+    Parameters:
+        circ (QuantumCircuit): Quantum circuit
+
+    Attributes:
+        num_qubits (int): Number of circuit qubits
+        one_qubit (dict): Counts of ``sx`` and ``x`` gates on each qubit,
+                          arrays of length ``num_qubits`` keyed by gate name
+        two_qubit (dict): Tuples of the ``(num_pairs, 2)`` array of ordered
+                          qubit pairs and their counts, keyed by gate name
+        readout (ndarray): Counts of measurements and resets on each qubit
+    """
+
+    def __init__(self, circ):
+        self.num_qubits = circ.num_qubits
+        self.one_qubit = {}
+        self.readout = np.zeros(circ.num_qubits, dtype=np.int64)
+        pairs = {}
+        for item in circ._data:
+            if item[0].num_qubits == 2 and item[0].name != "barrier":
+                q0 = circ.find_bit(item[1][0]).index
+                q1 = circ.find_bit(item[1][1]).index
+                gate_pairs = pairs.setdefault(item[0].name, {})
+                gate_pairs[(q0, q1)] = gate_pairs.get((q0, q1), 0) + 1
+            elif item[0].name in ["sx", "x"]:
+                q0 = circ.find_bit(item[1][0]).index
+                if item[0].name not in self.one_qubit:
+                    self.one_qubit[item[0].name] = np.zeros(
+                        circ.num_qubits, dtype=np.int64
+                    )
+                self.one_qubit[item[0].name][q0] += 1
+            elif item[0].name in ["measure", "reset"]:
+                q0 = circ.find_bit(item[1][0]).index
+                self.readout[q0] += 1
+        self.two_qubit = {
+            name: (
+                np.array(list(gate_pairs), dtype=np.intp).reshape(-1, 2),
+                np.array(list(gate_pairs.values()), dtype=np.int64),
+            )
+            for name, gate_pairs in pairs.items()
+        }
+
+
+def _supports_gates(circ, config, ignore=_SCORED_IGNORE):
+    """Whether the operations of a circuit are basis gates of a backend.
+
+    Parameters:
+        circ (QuantumCircuit): Quantum circuit
+        config (BackendConfiguration): Configuration of the backend
+        ignore (tuple): Operations that need not be basis gates
+
+    Returns:
+        bool: True if all other operations are basis gates
+    """
+    return set(circ.count_ops()).difference(ignore).issubset(config.basis_gates)
+
+
+def log_fidelities(counts, tables, layouts):
+    """Log-fidelity of the default cost for every row of a layout matrix.
+
+    Parameters:
+        counts (CircuitCounts): Operation counts of the circuit
+        tables (ErrorTables): Error tables of the backend
+        layouts (ndarray): Layouts as a ``(num_layouts, num_qubits)``
+                           integer array
+
+    Returns:
+        ndarray: Log-fidelity of each layout
+    """
+    terms = log_fidelity_terms(counts, tables, layouts)
+    return terms["1q"] + terms["readout"] + terms["2q"]
+
+
+def log_fidelity_terms(counts, tables, layouts):
+    """Log-fidelities of the single qubit gates, readout and two qubit gates
+    for every row of a layout matrix.
+
+    Parameters:
+        counts (CircuitCounts): Operation counts of the circuit
+        tables (ErrorTables): Error tables of the backend
+        layouts (ndarray): Layouts as a ``(num_layouts, num_qubits)``
+                           integer array
+
+    Returns:
+        dict: Log-fidelity arrays keyed by ``"1q"``, ``"readout"`` and ``"2q"``
+    """
+    log_fids = tables.log_arrays
+    terms = {key: np.zeros(layouts.shape[0]) for key in ["1q", "readout", "2q"]}
+    for name, qubit_counts in counts.one_qubit.items():
+        used = np.flatnonzero(qubit_counts)
+        terms["1q"] += log_fids["1q:" + name][layouts[:, used]] @ qubit_counts[used]
+    used = np.flatnonzero(counts.readout)
+    if used.size:
+        terms["readout"] += log_fids["readout"][layouts[:, used]] @ counts.readout[used]
+    for name, (pairs, pair_counts) in counts.two_qubit.items():
+        table = log_fids["2q:" + name]
+        terms["2q"] += (
+            table[layouts[:, pairs[:, 0]], layouts[:, pairs[:, 1]]] @ pair_counts
+        )
+    return terms
+
+
+def log_fidelity_bound(counts, tables):
+    """Upper bound of the log-fidelity of the default cost over all layouts,
+    charging every operation the smallest error of its kind on the backend.
+
+    Parameters:
+        counts (CircuitCounts): Operation counts of the circuit
+        tables (ErrorTables): Error tables of the backend
+
+    Returns:
+        float: Largest possible log-fidelity
+    """
+    log_fids = tables.log_arrays
+    terms = [
+        (qubit_counts.sum(), log_fids.get("1q:" + name))
+        for name, qubit_counts in counts.one_qubit.items()
+    ]
+    terms.append((counts.readout.sum(), log_fids.get("readout")))
+    terms.extend(
+        (pair_counts.sum(), log_fids.get("2q:" + name))
+        for name, (_, pair_counts) in counts.two_qubit.items()
+    )
+    bound = 0.0
+    for count, table in terms:
+        # Gates without calibration data are not bounded
+        if count and table is not None and not np.all(np.isnan(table)):
+            bound += count * np.nanmax(table)
+    return float(bound)
+
+
+def pareto_front(values):
+    """Indices of the Pareto-optimal rows of a matrix of metrics to minimize.
+
+    A row is Pareto-optimal if no other row is at most as large in every
+    metric and smaller in at least one.  Rows with equal metrics are all
+    kept.
+
+    Parameters:
+        values (ndarray): Metrics as a ``(num_rows, num_metrics)`` array
+
+    Returns:
+        ndarray: Row indices of the Pareto-optimal set, ordered
+        lexicographically by the metrics
+    """
+    values = np.asarray(values)
+    # Any row that dominates another precedes it in lexicographic order, so
+    # the first remaining row is always optimal
+    remaining = np.lexsort(values.T[::-1])
+    front = []
+    while remaining.size:
+        best = values[remaining[0]]
+        front.append(remaining[0])
+        rest = values[remaining[1:]]
+        dominated = np.all(best <= rest, axis=1) & np.any(best < rest, axis=1)
+        remaining = remaining[1:][~dominated]
+    return np.array(front, dtype=np.intp)
@@ -0,0 +1,354 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Long-lived layout service for a fleet of backends"""
+
+import collections
+import contextvars
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from .atlas import LayoutAtlas
+from .backends import BackendSnapshot
+from .layouts import (
+    _best_layout,
+    _check_approximate,
+    _search_backends,
+    calibration_changes,
+    calibration_table,
+    default_cost,
+)
+
+# Prepared backends and settings of a process pool worker
+_WORKER_STATE = {}
+
+
+class PreparedBackend:
+    """A backend with everything needed for layout queries built once.
+
+    Parameters:
+        backend (IBMQBackend): An IBM Quantum backend instance
+        atlas (LayoutAtlas or bool): Atlas of the backend coupling map, or
+                                     True to build one, default=None
+
+    Attributes:
+        snapshot (BackendSnapshot): Backend with stored configuration and
+                                    calibration data
+        coupling_map (CouplingMap): Coupling map of the backend
+        calibration (dict): Output of ``calibration_table``
+        atlas (LayoutAtlas): Atlas of the coupling map, or None
+        tables (ErrorTables): Error tables of the calibration data, reused
+                              by the built-in cost functions
+    """
+
+    def __init__(self, backend, atlas=None):
+        # pylint: disable=import-outside-toplevel
+        from qiskit.transpiler.coupling import CouplingMap
+
+        if isinstance(backend, BackendSnapshot) and backend.backend is not None:
+            backend = backend.backend
+        if isinstance(backend, BackendSnapshot):
+            # Loaded snapshots have no backend to fetch new data from
+            self.snapshot = backend
+        else:
+            self.snapshot = BackendSnapshot(backend)
+        self.coupling_map = CouplingMap(self.snapshot.configuration().coupling_map)
+        self.calibration = calibration_table(self.snapshot)
+        self.tables = self.snapshot.error_tables()
+        if atlas is True:
+            atlas = LayoutAtlas.build(self.coupling_map)
+        self.atlas = atlas or None
+
+    @property
+    def name(self):
+        """Backend name"""
+        return self.snapshot.configuration().backend_name
+
+
+class LayoutService:
+    """Serve layout queries against a fleet of backends prepared once.
+
+    The configuration, calibration data and coupling map of every backend
+    are fetched and built when the service starts, and again only when
+    ``refresh`` finds that the calibration of a backend changed.  Queries
+    run in a thread or process pool.
+
+    Parameters:
+        backends (IBMQBackend or list): A single or list of backends.
+        call_limit (int): Maximum number of calls to VF2 mapper.
+        cost_function (callable): Custom cost function, default=None
+        approximate (bool): Fall back to ``approximate_layouts`` on backends
+                            without an exact match, default=False.  Only
+                            available with ``default_cost`` and
+                            ``default_log_cost``
+        time_budget (float): Time in sec for each approximate search
+        max_workers (int): Size of the worker pool, default=None
+        processes (bool): Use a process pool instead of threads.  The cost
+                          function must then be picklable, default=False
+        history (int): Number of recent query latencies kept
+        atlases (bool or dict): Build a ``LayoutAtlas`` for every backend if
+                                True, or use the given atlases keyed by
+                                backend name, default=None
+
+    Raises:
+        ValueError: An atlas was built for another coupling map than its
+                    backend's
+
+    Example:
+        .. code-block:: python
+
+            with LayoutService(backends) as service:
+                layout, name, error = service.best_layout(small_qc)
+                service.refresh()
+                print(service.latency_percentiles())
+    """
+
+    def __init__(
+        self,
+        backends,
+        call_limit=int(3e7),
+        cost_function=None,
+        approximate=False,
+        time_budget=1.0,
+        max_workers=None,
+        processes=False,
+        history=10000,
+        atlases=None,
+    ):
+        if not isinstance(backends, list):
+            backends = [backends]
+        if cost_function is None:
+            cost_function = default_cost
+        _check_approximate(cost_function, approximate)
+        self._backends = {}
+        self._prepared = {}
+        for backend in backends:
+            prepared = PreparedBackend(backend, atlas=atlases is True)
+            if isinstance(atlases, dict):
+                prepared.atlas = atlases.get(prepared.name)
+                if prepared.atlas and not prepared.atlas.matches(prepared.coupling_map):
+                    raise ValueError(
+                        "Atlas of {} is for another coupling map".format(prepared.name)
+                    )
+            self._backends[prepared.name] = (
+                prepared.snapshot.backend or prepared.snapshot
+            )
+            self._prepared[prepared.name] = prepared
+        self._settings = (call_limit, cost_function, approximate, time_budget)
+        self._max_workers = max_workers
+        self._processes = processes
+        self._latencies = collections.deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def backends(self):
+        """Names of the served backends"""
+        return list(self._prepared)
+
+    def submit(self, circ, successors=False):
+        """Queue a layout query.
+
+        Parameters:
+            circ (QuantumCircuit): Quantum circuit
+            successors (bool): Return list best mappings per backend
+
+        Returns:
+            Future: Resolves to the output of ``best_layout``
+        """
+        start = time.perf_counter()
+        with self._lock:
+            if self._processes:
+                future = self._executor.submit(_worker_query, circ, successors)
+            else:
+                # Threads record into the LayoutStats active at submission
+                future = self._executor.submit(
+                    contextvars.copy_context().run,
+                    _query,
+                    self._prepared,
+                    self._settings,
+                    circ,
+                    successors,
+                )
+
+        def record(_):
+            with self._lock:
+                self._latencies.append(time.perf_counter() - start)
+
+        future.add_done_callback(record)
+        return future
+
+    def best_layout(self, circ, successors=False):
+        """Find the best selection of qubits and backend for a circuit.
+
+        Parameters:
+            circ (QuantumCircuit): Quantum circuit
+            successors (bool): Return list best mappings per backend
+
+        Returns:
+            tuple: (best_layout, best_backend, best_error)
+            list: List of tuples for best match for each backend
+        """
+        return self.submit(circ, successors=successors).result()
+
+    def refresh(self, names=None, rtol=0, atol=0):
+        """Fetch new calibration data, re-preparing backends that changed.
+
+        Parameters:
+            names (list): Names of the backends to refresh, default all
+            rtol (float): Relative tolerance below which a change is ignored
+            atol (float): Absolute tolerance below which a change is ignored
+
+        Returns:
+            list: Names of the backends whose calibration changed
+        """
+        if names is None:
+            names = list(self._prepared)
+        changed = {}
+        for name in names:
+            # The coupling map does not change with the calibration
+            prepared = PreparedBackend(
+                self._backends[name], atlas=self._prepared[name].atlas
+            )
+            qubits, edges = calibration_changes(
+                self._prepared[name].calibration,
+                prepared.calibration,
+                rtol=rtol,
+                atol=atol,
+            )
+            if qubits or edges:
+                changed[name] = prepared
+        if changed:
+            with self._lock:
+                self._prepared = {**self._prepared, **changed}
+                if self._processes:
+                    # Workers hold a copy of the prepared backends
+                    old = self._executor
+                    self._executor = self._new_executor()
+                    old.shutdown(wait=False)
+        return list(changed)
+
+    def latency_percentiles(self, percentiles=(50, 90, 99)):
+        """Percentiles of the recent query latencies.
+
+        Parameters:
+            percentiles (tuple): Percentiles to compute
+
+        Returns:
+            dict: Latency in sec keyed by percentile, empty if no queries ran
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+        if not latencies:
+            return {}
+        values = np.percentile(latencies, percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
+    def close(self):
+        """Shut down the worker pool"""
+        self._executor.shutdown(wait=True)
+
+    def _new_executor(self):
+        if self._processes:
+            return ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                initializer=_init_worker,
+                initargs=(self._prepared, self._settings),
+            )
+        return ThreadPoolExecutor(max_workers=self._max_workers)
+
+
+def best_prepared_layout(
+    circ,
+    prepared,
+    successors=False,
+    call_limit=int(3e7),
+    cost_function=None,
+    approximate=False,
+    time_budget=1.0,
+):
+    """Find the best selection of qubits and backend over prepared backends.
+
+    This is the query answered by ``LayoutService``, for callers that run
+    queries in workers of their own.
+
+    Parameters:
+        circ (QuantumCircuit): Quantum circuit
+        prepared (list): ``PreparedBackend`` instances to search
+        successors (bool): Return list best mappings per backend
+        call_limit (int): Maximum number of calls to VF2 mapper.
+        cost_function (callable): Custom cost function, default=None
+        approximate (bool): Fall back to ``approximate_layouts`` on backends
+                            without an exact match, default=False
+        time_budget (float): Time in sec for each approximate search
+
+    Returns:
+        tuple: (best_layout, best_backend, best_error)
+        list: List of tuples for best match for each backend
+    """
+    if cost_function is None:
+        cost_function = default_cost
+    _check_approximate(cost_function, approximate)
+
+    by_snapshot = {id(item.snapshot): item for item in prepared}
+
+    def search(snapshot):
+        item = by_snapshot[id(snapshot)]
+        return _best_layout(
+            circ,
+            snapshot,
+            call_limit,
+            cost_function,
+            approximate,
+            time_budget,
+            coupling_map=item.coupling_map,
+            atlas=item.atlas,
+        )
+
+    best_out = _search_backends(
+        circ,
+        [item.snapshot for item in prepared],
+        search,
+        cost_function,
+        not successors and not approximate,
+    )
+    best_out.sort(key=lambda x: x[2])
+    if successors:
+        return best_out
+    if best_out:
+        return best_out[0]
+    return best_out
+
+
+def _query(prepared, settings, circ, successors):
+    """Answer a layout query against prepared backends"""
+    return best_prepared_layout(circ, list(prepared.values()), successors, *settings)
+
+
+def _init_worker(prepared, settings):
+    _WORKER_STATE["prepared"] = prepared
+    _WORKER_STATE["settings"] = settings
+
+
+def _worker_query(circ, successors):
+    return _query(
+        _WORKER_STATE["prepared"], _WORKER_STATE["settings"], circ, successors
+    )
@@ -0,0 +1,163 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Stage timing and counter instrumentation"""
+
+import contextlib
+import contextvars
+import time
+
+_CURRENT = contextvars.ContextVar("mapomatic_stats", default=None)
+_BACKEND = contextvars.ContextVar("mapomatic_stats_backend", default=None)
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+class LayoutStats:
+    """Per-backend stage timings and counters collected while finding layouts.
+
+    Mapomatic functions called inside the ``with`` block of an instance
+    record into it.  Outside of such a block instrumentation is disabled.
+
+    Recorded stages are ``bound``, ``configuration``, ``gate_check``,
+    ``atlas``, ``circuit_to_dag``, ``vf2``, ``properties``, ``scoring`` and
+    ``approximate``.  Counters are ``pruned``, ``atlas_hits``,
+    ``atlas_mismatch``, ``vf2_calls``, ``vf2_states``, ``call_limit_hit``,
+    ``layouts_found``, ``layouts_unique`` and ``layouts_scored``.
+
+    Parameters:
+        callback (callable): Called as ``callback(backend, stage, seconds)``
+                             at the end of every stage, default=None
+
+    Attributes:
+        timings (dict): Total seconds per stage, keyed by backend name
+        counters (dict): Counter values, keyed by backend name
+    """
+
+    enabled = True
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.timings = {}
+        self.counters = {}
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_CURRENT.set(self))
+        return self
+
+    def __exit__(self, *args):
+        _CURRENT.reset(self._tokens.pop())
+
+    def __str__(self):
+        lines = []
+        for backend in dict.fromkeys(list(self.timings) + list(self.counters)):
+            lines.append("{}:".format(backend))
+            for stage, seconds in self.timings.get(backend, {}).items():
+                lines.append("  {:<16} {:.6f} s".format(stage, seconds))
+            for name, value in self.counters.get(backend, {}).items():
+                lines.append("  {:<16} {}".format(name, value))
+        return "\n".join(lines)
+
+    @contextlib.contextmanager
+    def backend(self, backend):
+        """Attribute the stages and counters inside the block to a backend.
+
+        Parameters:
+            backend (IBMQBackend or str): Backend instance or name
+        """
+        name = backend if isinstance(backend, str) else _backend_name(backend)
+        token = _BACKEND.set(name)
+        try:
+            yield
+        finally:
+            _BACKEND.reset(token)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time the enclosed block as a stage.
+
+        Parameters:
+            name (str): Stage name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            backend = _BACKEND.get()
+            timings = self.timings.setdefault(backend, {})
+            timings[name] = timings.get(name, 0) + elapsed
+            if self.callback is not None:
+                self.callback(backend, name, elapsed)
+
+    def count(self, name, value=1):
+        """Increment a counter.
+
+        Parameters:
+            name (str): Counter name
+            value (int): Increment
+        """
+        counters = self.counters.setdefault(_BACKEND.get(), {})
+        counters[name] = counters.get(name, 0) + value
+
+    def flag(self, name, value):
+        """Set a boolean counter, keeping it set once it is True.
+
+        Parameters:
+            name (str): Counter name
+            value (bool): Flag value
+        """
+        counters = self.counters.setdefault(_BACKEND.get(), {})
+        counters[name] = counters.get(name, False) or bool(value)
+
+
+class _NullStats:
+    """Stand-in for ``LayoutStats`` when instrumentation is disabled"""
+
+    enabled = False
+
+    def backend(self, backend):  # pylint: disable=unused-argument
+        """Do nothing in place of ``LayoutStats.backend``"""
+        return _NULL_CONTEXT
+
+    def stage(self, name):  # pylint: disable=unused-argument
+        """Do nothing in place of ``LayoutStats.stage``"""
+        return _NULL_CONTEXT
+
+    def count(self, name, value=1):
+        """Do nothing in place of ``LayoutStats.count``"""
+
+    def flag(self, name, value):
+        """Do nothing in place of ``LayoutStats.flag``"""
+
+
+_NULL_STATS = _NullStats()
+
+
+def current_stats():
+    """The active ``LayoutStats`` instance, or a no-op stand-in.
+
+    Returns:
+        LayoutStats: Active stats collector
+    """
+    stats = _CURRENT.get()
+    if stats is None:
+        return _NULL_STATS
+    return stats
+
+
+def _backend_name(backend):
+    """Name of a BackendV1 or BackendV2 instance"""
+    name = getattr(backend, "name", None)
+    if callable(name):
+        name = name()
+    return name
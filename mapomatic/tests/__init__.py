@@ -9,3 +9,48 @@
 # Any modifications or derivative works of this code must retain this
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
+
+"""Shared test circuits and reference costs"""
+
+from qiskit import QuantumCircuit, transpile
+
+import mapomatic as mm
+
+
+def ghz_circuit(num_qubits, backend, star=False):
+    """Deflated GHZ circuit transpiled for a backend.
+
+    Parameters:
+        num_qubits (int): Number of qubits
+        backend (BackendV2): Backend the circuit is transpiled for
+        star (bool): Entangle every qubit with qubit 0 instead of along
+                     a chain, default=False
+
+    Returns:
+        QuantumCircuit: Deflated circuit
+    """
+    qc = QuantumCircuit(num_qubits)
+    qc.h(0)
+    for qubit in range(1, num_qubits):
+        qc.cx(0 if star else qubit - 1, qubit)
+    qc.measure_all()
+    trans_qc = transpile(qc, backend, seed_transpiler=1234)
+    return mm.deflate_circuit(trans_qc)
+
+
+def product_cost(circ, layouts, backend):
+    """Default cost as a product of gate fidelities"""
+    props = backend.properties()
+    out = []
+    for layout in layouts:
+        fid = 1
+        for item in circ._data:
+            qubits = [layout[circ.find_bit(qubit).index] for qubit in item[1]]
+            if item[0].num_qubits == 2 and item[0].name != "barrier":
+                fid *= 1 - props.gate_error(item[0].name, qubits)
+            elif item[0].name in ["sx", "x"]:
+                fid *= 1 - props.gate_error(item[0].name, qubits[0])
+            elif item[0].name in ["measure", "reset"]:
+                fid *= 1 - props.readout_error(qubits[0])
+        out.append((layout, 1 - fid))
+    return out
@@ -0,0 +1,102 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test asyncio layout selection"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from qiskit_ibm_runtime.fake_provider import FakeBelemV2, FakeQuitoV2, FakeLimaV2
+
+import mapomatic as mm
+from mapomatic.tests import ghz_circuit
+
+
+class SlowBackend:
+    """Backend whose configuration and calibration fetches are slow"""
+
+    def __init__(self, backend, latency):
+        self.backend = backend
+        self.latency = latency
+        self.name = backend.name
+
+    def configuration(self):
+        """Configuration after a delay"""
+        time.sleep(self.latency)
+        return self.backend.configuration()
+
+    def properties(self):
+        """Properties after a delay"""
+        time.sleep(self.latency)
+        return self.backend.properties()
+
+
+def test_async_matches_sync():
+    """Async results match best_overall_layout and fetches run concurrently"""
+    small_qc = ghz_circuit(3, FakeBelemV2(), star=True)
+    backends = [FakeBelemV2(), FakeQuitoV2(), FakeLimaV2()]
+    expected = mm.best_overall_layout(small_qc, backends, successors=True)
+
+    slow = [SlowBackend(backend, 0.2) for backend in backends]
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        start = time.perf_counter()
+        res = asyncio.run(
+            mm.best_overall_layout_async(
+                small_qc, slow, successors=True, executor=executor
+            )
+        )
+        elapsed = time.perf_counter() - start
+    assert res == expected
+    # Six fetches of 0.2 sec each
+    assert elapsed < 1.2
+
+
+def test_async_streams_results():
+    """Results are yielded as each backend finishes"""
+    small_qc = ghz_circuit(3, FakeBelemV2(), star=True)
+    backends = [SlowBackend(FakeBelemV2(), 0.3), SlowBackend(FakeLimaV2(), 0.01)]
+
+    async def collect():
+        return [
+            item[1]
+            async for item in mm.iter_backend_layouts(
+                small_qc, backends, executor=executor
+            )
+        ]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        names = asyncio.run(collect())
+    assert names == ["fake_lima", "fake_belem"]
+
+
+def test_async_timeout():
+    """Backends that miss the deadline are cancelled"""
+    small_qc = ghz_circuit(3, FakeBelemV2(), star=True)
+    backends = [SlowBackend(FakeBelemV2(), 1.0), SlowBackend(FakeLimaV2(), 0.01)]
+    executor = ThreadPoolExecutor(max_workers=4)
+    res = asyncio.run(
+        mm.best_overall_layout_async(
+            small_qc, backends, successors=True, executor=executor, timeout=0.5
+        )
+    )
+    assert [item[1] for item in res] == ["fake_lima"]
+
+    async def stream():
+        async for _ in mm.iter_backend_layouts(
+            small_qc, backends, executor=executor, timeout=0.5
+        ):
+            pass
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(stream())
+    executor.shutdown(wait=False)
@@ -0,0 +1,156 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test approximate layouts"""
+
+import copy
+
+import numpy as np
+import pytest
+from qiskit import QuantumCircuit
+from qiskit_ibm_runtime.fake_provider import (
+    FakeBelemV2,
+    FakeMontrealV2,
+    FakeSantiagoV2,
+)
+
+import mapomatic as mm
+from mapomatic.approximate import _layout_costs, _total_cost
+from mapomatic.layouts import decoherence_cost, default_log_cost
+
+
+def all_to_all(num_qubits):
+    """Circuit with a CX between every pair of qubits"""
+    qc = QuantumCircuit(num_qubits)
+    for idx in range(num_qubits):
+        for jdx in range(idx + 1, num_qubits):
+            qc.cx(idx, jdx)
+    qc.measure_all()
+    return qc
+
+
+class CutBackend:
+    """Backend with a coupler removed from the coupling map or calibration"""
+
+    def __init__(self, backend, edge, uncalibrated=False):
+        self.backend = backend
+        self.edge = set(edge)
+        self.uncalibrated = uncalibrated
+
+    def configuration(self):
+        """Configuration without the coupler unless it is only uncalibrated"""
+        config = copy.deepcopy(self.backend.configuration())
+        if not self.uncalibrated:
+            config.coupling_map = [
+                edge for edge in config.coupling_map if set(edge) != self.edge
+            ]
+        return config
+
+    def properties(self):
+        """Calibration data without the coupler"""
+        props = copy.deepcopy(self.backend.properties())
+        props.gates = [gate for gate in props.gates if set(gate.qubits) != self.edge]
+        return props
+
+
+def test_approximate_layouts_no_exact_match():
+    """Approximate layouts are found when there is no exact match"""
+    qc = all_to_all(5)
+    backend = FakeMontrealV2()
+    assert mm.matching_layouts(qc, backend) == []
+    res = mm.approximate_layouts(
+        qc, backend, num_layouts=5, max_iterations=2000, time_budget=60, seed=1
+    )
+    assert 0 < len(res) <= 5
+    costs = [item[1] for item in res]
+    assert costs == sorted(costs)
+    for layout, cost in res:
+        assert len(set(layout)) == 5
+        assert 0 < cost < 1
+
+
+def test_approximate_layouts_exact_match():
+    """Approximate search recovers the best exact layout of a line"""
+    qc = QuantumCircuit(6)
+    for idx in range(5):
+        qc.cx(idx, idx + 1)
+    qc.measure_all()
+    backend = FakeMontrealV2()
+    exact = mm.evaluate_layouts(qc, mm.matching_layouts(qc, backend), backend)
+    res = mm.approximate_layouts(
+        qc, backend, max_iterations=2000, time_budget=60, seed=1
+    )
+    assert np.allclose(res[0][1], exact[0][1])
+
+
+def test_best_overall_layout_approximate():
+    """Backends without an exact match are only included in approximate mode"""
+    qc = all_to_all(4)
+    backend = FakeMontrealV2()
+    assert mm.best_overall_layout(qc, backend) == []
+    res = mm.best_overall_layout(qc, backend, approximate=True, time_budget=0.1)
+    assert res[1] == "fake_montreal"
+    assert len(set(res[0])) == 4
+
+
+def test_approximate_cost_scale():
+    """Approximate results are on the scale of the cost function"""
+    qc = QuantumCircuit(4)
+    for idx in range(1, 4):
+        qc.cx(0, idx)
+    qc.measure_all()
+    backends = [FakeBelemV2(), FakeSantiagoV2()]
+    res = mm.best_overall_layout(
+        qc,
+        backends,
+        successors=True,
+        cost_function=default_log_cost,
+        approximate=True,
+        time_budget=0.1,
+    )
+    costs = {name: cost for _, name, cost in res}
+    exact = mm.evaluate_layouts(
+        qc,
+        mm.matching_layouts(qc, backends[0]),
+        backends[0],
+        cost_function=default_log_cost,
+    )
+    assert np.allclose(costs["fake_belem"], exact[0][1])
+    approx = [item for item in res if item[1] == "fake_santiago"][0]
+    estimate = _total_cost(_layout_costs(qc, backends[1]), approx[0])
+    assert np.allclose(approx[2], estimate)
+    with pytest.raises(ValueError):
+        mm.best_overall_layout(
+            qc, backends, cost_function=decoherence_cost, approximate=True
+        )
+
+
+def test_approximate_disconnected_device():
+    """Layouts never span disconnected parts of the device"""
+    backend = CutBackend(FakeBelemV2(), (1, 3))
+    assert not mm.approximate_layouts(all_to_all(4), backend, seed=1)
+    assert not mm.best_overall_layout(
+        all_to_all(4), backend, approximate=True, time_budget=0.1
+    )
+    res = mm.approximate_layouts(all_to_all(3), backend, seed=1)
+    assert res
+    for layout, cost in res:
+        assert set(layout) == {0, 1, 2}
+        assert 0 < cost < 1
+
+
+def test_approximate_uncalibrated_coupler():
+    """Couplers without calibration data are charged the maximal error"""
+    qc = all_to_all(2)
+    backend = CutBackend(FakeBelemV2(), (1, 3), uncalibrated=True)
+    costs = _layout_costs(qc, backend)
+    assert np.isclose(costs["pair"][1, 3], -np.log(1e-12))
+    assert costs["pair"][1, 3] > 10 * costs["pair"][0, 1]
@@ -0,0 +1,94 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test the layout atlas"""
+
+import pytest
+from qiskit import QuantumCircuit
+from qiskit_ibm_runtime.fake_provider import FakeGuadalupeV2, FakeMontrealV2
+
+import mapomatic as mm
+
+SHAPES = [("line", 4), ("line", 5), ("star", 4), ("ring", 12)]
+
+
+def shape_circuits():
+    """Circuits whose interaction graphs are atlas shapes, in shuffled order"""
+    line = QuantumCircuit(5)
+    for pair in [(2, 4), (4, 0), (1, 3), (0, 3)]:
+        line.cx(*pair)
+    line.cx(3, 0)
+    star = QuantumCircuit(4)
+    star.cx(1, 0)
+    star.cx(1, 2)
+    star.cx(3, 1)
+    star.rz(0.1, 1)
+    star.measure_all()
+    return [line, star]
+
+
+def test_atlas_matches_vf2():
+    """Atlas layouts are the layouts found by VF2"""
+    backend = FakeMontrealV2()
+    atlas = mm.LayoutAtlas.build(backend, shapes=SHAPES)
+    for circ in shape_circuits():
+        for strict in [True, False]:
+            layouts = atlas.layouts(circ, strict_direction=strict)
+            expected = mm.matching_layouts(circ, backend, strict_direction=strict)
+            assert layouts
+            assert sorted(layouts) == sorted(expected)
+            assert (
+                mm.matching_layouts(circ, backend, strict_direction=strict, atlas=atlas)
+                == layouts
+            )
+
+
+def test_atlas_unknown_shape():
+    """Circuits that are no atlas shape fall back to VF2"""
+    backend = FakeMontrealV2()
+    atlas = mm.LayoutAtlas.build(backend, shapes=SHAPES)
+    circ = QuantumCircuit(4)
+    circ.cx(0, 1)
+    circ.cx(1, 2)
+    circ.cx(2, 0)
+    circ.cx(2, 3)
+    assert atlas.layouts(circ) is None
+    with mm.LayoutStats() as stats:
+        layouts = mm.matching_layouts(circ, backend, atlas=atlas)
+    assert layouts == mm.matching_layouts(circ, backend)
+    assert "atlas_hits" not in stats.counters[None]
+
+
+def test_atlas_other_coupling_map():
+    """An atlas of another coupling map is not used"""
+    backend = FakeMontrealV2()
+    atlas = mm.LayoutAtlas.build(FakeGuadalupeV2(), shapes=SHAPES)
+    assert atlas.matches(FakeGuadalupeV2().coupling_map)
+    assert not atlas.matches(backend.coupling_map)
+    for circ in shape_circuits():
+        with mm.LayoutStats() as stats:
+            layouts = mm.matching_layouts(circ, backend, atlas=atlas)
+        assert layouts == mm.matching_layouts(circ, backend)
+        assert stats.counters[None]["atlas_mismatch"]
+    with pytest.raises(ValueError):
+        mm.LayoutService([backend], atlases={"fake_montreal": atlas})
+
+
+def test_atlas_save_load(tmp_path):
+    """Saved atlases load with the same layouts"""
+    backend = FakeMontrealV2()
+    atlas = mm.LayoutAtlas.build(backend, shapes=SHAPES)
+    path = tmp_path / "montreal.npz"
+    atlas.save(path)
+    loaded = mm.LayoutAtlas.load(path)
+    assert loaded.cmap.get_edges() == atlas.cmap.get_edges()
+    for circ in shape_circuits():
+        assert loaded.layouts(circ) == atlas.layouts(circ)
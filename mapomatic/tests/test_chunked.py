@@ -0,0 +1,98 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test chunked layout evaluation"""
+
+import numpy as np
+from qiskit_ibm_runtime.fake_provider import FakeMontrealV2
+
+import mapomatic as mm
+from mapomatic.layouts import _layout_bytes, default_cost
+from mapomatic.tests import ghz_circuit
+
+
+def test_iter_matching_layouts():
+    """Streamed layouts are the same as the matching layouts"""
+    backend = FakeMontrealV2()
+    small_qc = ghz_circuit(5, backend)
+    layouts = mm.matching_layouts(small_qc, backend)
+    assert list(mm.iter_matching_layouts(small_qc, backend)) == layouts
+
+
+def test_chunked_top_k():
+    """Running top-k over chunks matches evaluating all layouts at once"""
+    backend = FakeMontrealV2()
+    small_qc = ghz_circuit(5, backend)
+    expected = mm.evaluate_layouts(
+        small_qc, mm.matching_layouts(small_qc, backend), backend
+    )
+    res = mm.chunked_evaluate_layouts(
+        small_qc,
+        mm.iter_matching_layouts(small_qc, backend),
+        backend,
+        top_k=5,
+        max_rows=7,
+    )
+    assert res == expected[:5]
+    res = mm.chunked_evaluate_layouts(
+        small_qc, np.array([item[0] for item in expected]), backend, max_rows=7
+    )
+    assert res == expected
+
+
+def test_chunked_threshold():
+    """Layouts above the threshold are dropped"""
+    backend = FakeMontrealV2()
+    small_qc = ghz_circuit(5, backend)
+    layouts = mm.matching_layouts(small_qc, backend)
+    expected = mm.evaluate_layouts(small_qc, layouts, backend)
+    threshold = expected[len(expected) // 2][1]
+    res = mm.chunked_evaluate_layouts(
+        small_qc, layouts, backend, threshold=threshold, max_rows=10
+    )
+    assert res == [item for item in expected if item[1] <= threshold]
+
+
+def test_chunked_max_bytes():
+    """Chunks stay under the byte ceiling"""
+    backend = FakeMontrealV2()
+    small_qc = ghz_circuit(5, backend)
+    layouts = mm.matching_layouts(small_qc, backend)
+    sizes = []
+
+    def cost(circ, chunk, backend):
+        sizes.append(len(chunk))
+        return default_cost(circ, chunk, backend)
+
+    max_bytes = 10 * _layout_bytes(small_qc.num_qubits)
+    res = mm.chunked_evaluate_layouts(
+        small_qc, layouts, backend, cost_function=cost, top_k=1, max_bytes=max_bytes
+    )
+    assert max(sizes) == 10
+    assert sum(sizes) == len(layouts)
+    assert res == mm.evaluate_layouts(small_qc, layouts, backend)[:1]
+
+
+def test_chunked_spill(tmp_path):
+    """Scores of all layouts are spilled to a table"""
+    backend = FakeMontrealV2()
+    small_qc = ghz_circuit(5, backend)
+    layouts = mm.matching_layouts(small_qc, backend)
+    path = str(tmp_path / "scores")
+    res = mm.chunked_evaluate_layouts(
+        small_qc, layouts, backend, top_k=3, max_rows=16, spill=path
+    )
+    table = mm.load_layouts(path)
+    assert len(table) == len(layouts)
+    assert [row[0] for row in table] == layouts
+    assert set(table.backends) == {backend.name}
+    best = sorted(table, key=lambda x: x[2])[:3]
+    assert [(row[0], row[2]) for row in best] == res
@@ -0,0 +1,104 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test the command line tool"""
+
+import json
+
+import numpy as np
+from qiskit import QuantumCircuit, transpile, qpy
+from qiskit_ibm_runtime.fake_provider import FakeBelemV2, FakeLimaV2
+
+import mapomatic as mm
+from mapomatic.backends import load_snapshot, save_snapshot
+from mapomatic.cli import main
+
+
+def ghz_circuits():
+    """Transpiled GHZ circuits of 3 to 5 qubits"""
+    circuits = []
+    for num_qubits in range(3, 6):
+        qc = QuantumCircuit(num_qubits, name="ghz{}".format(num_qubits))
+        qc.h(0)
+        for qubit in range(num_qubits - 1):
+            qc.cx(qubit, qubit + 1)
+        qc.measure_all()
+        circuits.append(transpile(qc, FakeLimaV2(), seed_transpiler=1234))
+    return circuits
+
+
+def test_snapshot_round_trip(tmp_path):
+    """Saved snapshots give the same layouts as the backend"""
+    small_qc = mm.deflate_circuit(ghz_circuits()[0])
+    backend = FakeBelemV2()
+    save_snapshot(backend, tmp_path / "belem.json")
+    snapshot = load_snapshot(tmp_path / "belem.json")
+    assert snapshot.name == "fake_belem"
+    assert mm.best_overall_layout(small_qc, snapshot) == mm.best_overall_layout(
+        small_qc, backend
+    )
+
+
+def test_cli(tmp_path):
+    """Command output matches best_overall_layout and resumes"""
+    circuits = ghz_circuits()
+    with open(tmp_path / "ghz.qpy", "wb") as fd:
+        qpy.dump(circuits, fd)
+    save_snapshot(FakeBelemV2(), tmp_path / "belem.json")
+    output = str(tmp_path / "out.jsonl")
+    args = [
+        str(tmp_path),
+        "-b",
+        "fake_lima",
+        "-b",
+        str(tmp_path / "belem.json"),
+        "-o",
+        output,
+        "--progress",
+        "0",
+    ]
+    assert main(args + ["-j", "2"]) == 0
+    with open(output, encoding="utf-8") as fd:
+        records = [json.loads(line) for line in fd]
+    backends = [FakeLimaV2(), FakeBelemV2()]
+    for index, (record, circ) in enumerate(zip(records, circuits)):
+        assert record["index"] == index
+        assert record["name"] == circ.name
+        expected = mm.best_overall_layout(
+            mm.deflate_circuit(circ), backends, successors=True
+        )
+        assert record["layouts"] == [list(item) for item in expected]
+
+    # Cut the output in the middle of the last record and resume
+    with open(output, "rb+") as fd:
+        fd.truncate(len(fd.read()) - 10)
+    assert main(args + ["-j", "0", "--resume"]) == 0
+    with open(output, encoding="utf-8") as fd:
+        assert [json.loads(line) for line in fd] == records
+
+
+def test_cli_table(tmp_path):
+    """Columnar command output matches the JSON lines output"""
+    circuits = ghz_circuits()
+    with open(tmp_path / "ghz.qpy", "wb") as fd:
+        qpy.dump(circuits, fd)
+    args = [str(tmp_path / "ghz.qpy"), "-b", "fake_lima", "-b", "fake_belem"]
+    args += ["-j", "0", "--progress", "0"]
+    main(args + ["-o", str(tmp_path / "out.jsonl")])
+    main(args + ["-o", str(tmp_path / "out"), "-f", "table"])
+    with open(tmp_path / "out.jsonl", encoding="utf-8") as fd:
+        records = [json.loads(line) for line in fd]
+    table = mm.load_layouts(tmp_path / "out")
+    assert len(table.circuits) == len(records)
+    for index, record in enumerate(records):
+        rows = np.flatnonzero(table.circuit_codes == index)
+        assert [list(table[row]) for row in rows] == record["layouts"]
+        assert table.circuits[index]["name"] == record["name"]
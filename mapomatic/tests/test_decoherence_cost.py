@@ -0,0 +1,101 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test the built-in decoherence cost"""
+
+import numpy as np
+from qiskit import transpile, QuantumCircuit
+from qiskit_ibm_runtime.fake_provider import FakeBelemV2, FakeMontrealV2
+
+import mapomatic as mm
+from mapomatic.layouts import decoherence_cost, idle_error
+
+
+def test_decoherence_cost_matches_scheduled_transpile():
+    """Decoherence cost matches scoring an ALAP scheduled transpile per layout"""
+    qc = QuantumCircuit(4)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.cx(0, 2)
+    qc.cx(2, 3)
+    qc.sx(1)
+    qc.measure_all()
+
+    backend = FakeMontrealV2()
+    trans_qc = transpile(qc, backend, seed_transpiler=1234)
+    small_qc = mm.deflate_circuit(trans_qc)
+    layouts = mm.matching_layouts(small_qc, backend)[:10]
+    res = decoherence_cost(small_qc, layouts, backend)
+    expected = scheduled_cost(small_qc, layouts, backend)
+    for item, ans in zip(res, expected):
+        assert item[0] == ans[0]
+        assert np.allclose(item[1], ans[1])
+
+
+def test_decoherence_cost_adds_idle_error():
+    """Decoherence cost is never less than the default cost"""
+    qc = QuantumCircuit(3)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.cx(0, 2)
+    qc.measure_all()
+
+    backend = FakeBelemV2()
+    trans_qc = transpile(qc, backend, seed_transpiler=1234)
+    small_qc = mm.deflate_circuit(trans_qc)
+    layouts = mm.matching_layouts(small_qc, backend)
+    res = mm.evaluate_layouts(
+        small_qc, layouts, backend, cost_function=decoherence_cost
+    )
+    default = dict(
+        (tuple(layout), cost)
+        for layout, cost in mm.evaluate_layouts(small_qc, layouts, backend)
+    )
+    assert len(res) == len(layouts)
+    for layout, cost in res:
+        assert cost > default[tuple(layout)]
+
+
+def scheduled_cost(circ, layouts, backend):
+    """Reference idle cost that schedules a transpiled circuit per layout"""
+    out = []
+    props = backend.properties()
+    dt = backend.configuration().dt
+    for layout in layouts:
+        sch_circ = transpile(
+            circ,
+            backend,
+            initial_layout=layout,
+            optimization_level=0,
+            scheduling_method="alap",
+        )
+        fid = 1
+        touched = set()
+        for item in sch_circ.data:
+            name = item.operation.name
+            qubits = [sch_circ.find_bit(qubit).index for qubit in item.qubits]
+            if name == "delay":
+                if qubits[0] in touched:
+                    time = item.operation.duration * dt
+                    fid *= 1 - idle_error(
+                        time, props.t1(qubits[0]), props.t2(qubits[0])
+                    )
+            elif name == "cx":
+                fid *= 1 - props.gate_error(name, qubits)
+                touched.update(qubits)
+            elif name in ["sx", "x"]:
+                fid *= 1 - props.gate_error(name, qubits[0])
+                touched.update(qubits)
+            elif name == "measure":
+                fid *= 1 - props.readout_error(qubits[0])
+                touched.update(qubits)
+        out.append((layout, 1 - fid))
+    return out
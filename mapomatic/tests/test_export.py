@@ -0,0 +1,73 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test columnar export of layout scores"""
+
+import numpy as np
+from qiskit_ibm_runtime.fake_provider import FakeBelemV2, FakeLimaV2, FakeQuitoV2
+
+import mapomatic as mm
+from mapomatic.export import LayoutTableWriter
+from mapomatic.tests import ghz_circuit
+
+
+def test_save_load_layouts(tmp_path):
+    """Saved layout scores load back as the same rows"""
+    small_qc = ghz_circuit(3, FakeBelemV2(), star=True)
+    backends = [FakeBelemV2(), FakeQuitoV2(), FakeLimaV2()]
+    results = mm.best_overall_layout(small_qc, backends, successors=True)
+    mm.save_layouts(tmp_path / "best", results, chunk_size=2)
+    table = mm.load_layouts(tmp_path / "best")
+    assert len(table) == len(results)
+    assert list(table) == results
+    assert table[1] == results[1]
+    assert table.rows(1) == results[1:]
+
+    backend = FakeBelemV2()
+    layouts = mm.matching_layouts(small_qc, backend)
+    scores = mm.evaluate_layouts(small_qc, layouts, backend)
+    mm.save_layouts(tmp_path / "belem", scores, backend="fake_belem")
+    table = mm.load_layouts(tmp_path / "belem")
+    assert table.backends == ["fake_belem"]
+    assert np.array_equal(table.costs, [score[1] for score in scores])
+    # Closed tables are plain .npy files
+    assert np.array_equal(
+        np.load(tmp_path / "belem" / "layouts.npy"), [score[0] for score in scores]
+    )
+
+
+def test_writer_append(tmp_path):
+    """Tables are readable up to the last chunk and can be appended to"""
+    path = tmp_path / "table"
+    writer = LayoutTableWriter(path, num_qubits=3, chunk_size=2)
+    writer.write([([0, 1], "a", 0.5)], circuit={"name": "first"})
+    writer.write(
+        [([1, 2, 3], "b", 0.1), ([2, 3], "a", 0.2)], circuit={"name": "second"}
+    )
+    # Not flushed before writing stops
+    writer.write([([3, 4, 5], "b", 0.3)], circuit={"name": "lost"})
+    table = mm.load_layouts(path)
+    assert list(table) == [
+        ([0, 1], "a", 0.5),
+        ([1, 2, 3], "b", 0.1),
+        ([2, 3], "a", 0.2),
+    ]
+    assert table.circuits == [{"name": "first"}, {"name": "second"}]
+    assert table.circuit_codes.tolist() == [0, 1, 1]
+
+    with LayoutTableWriter(path, append=True) as writer:
+        writer.write([([4, 5, 6], "c", 0.4)], circuit={"name": "third"})
+    table = mm.load_layouts(path)
+    assert len(table) == 4
+    assert table[3] == ([4, 5, 6], "c", 0.4)
+    assert table.backends == ["a", "b", "c"]
+    assert table.circuits[-1] == {"name": "third"}
+    assert table.circuit_codes.tolist() == [0, 1, 1, 2]
@@ -0,0 +1,41 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test that importing mapomatic does not load Qiskit"""
+
+import subprocess
+import sys
+
+import mapomatic as mm
+
+CHECK = """
+import sys
+{}
+loaded = sorted(name for name in sys.modules if name.split(".")[0] == "qiskit")
+assert not loaded, loaded
+"""
+
+
+def test_import_does_not_load_qiskit():
+    """Qiskit is only imported once a function needs it"""
+    for statement in [
+        "import mapomatic",
+        "from mapomatic import best_overall_layout, deflate_circuit, LayoutService",
+        "import mapomatic.cli",
+    ]:
+        subprocess.run([sys.executable, "-c", CHECK.format(statement)], check=True)
+
+
+def test_lazy_names():
+    """All public names resolve"""
+    for name in mm.__all__:
+        assert getattr(mm, name) is not None
+    assert "best_overall_layout" in dir(mm)
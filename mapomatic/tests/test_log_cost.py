@@ -0,0 +1,102 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test the log-fidelity cost functions"""
+
+import numpy as np
+from qiskit import QuantumCircuit, transpile
+from qiskit_ibm_runtime.fake_provider import FakeMontrealV2
+
+import mapomatic as mm
+from mapomatic.layouts import (
+    decoherence_cost,
+    decoherence_log_cost,
+    default_cost,
+    default_log_cost,
+)
+from mapomatic.tests import product_cost
+
+
+def build_circuit(backend):
+    """Deflated 4Q circuit"""
+    qc = QuantumCircuit(4)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.cx(0, 2)
+    qc.cx(2, 3)
+    qc.x(3)
+    qc.measure_all()
+    trans_qc = transpile(qc, backend, seed_transpiler=1234)
+    return mm.deflate_circuit(trans_qc)
+
+
+def test_default_cost_matches_product():
+    """Default cost matches the product of gate fidelities"""
+    backend = FakeMontrealV2()
+    small_qc = build_circuit(backend)
+    layouts = mm.matching_layouts(small_qc, backend)
+    res = default_cost(small_qc, layouts, backend)
+    expected = product_cost(small_qc, layouts, backend)
+    assert [item[0] for item in res] == layouts
+    assert np.allclose([item[1] for item in res], [item[1] for item in expected])
+
+
+def test_log_costs_match_costs():
+    """Log costs are the negative log-fidelities of the costs"""
+    backend = FakeMontrealV2()
+    small_qc = build_circuit(backend)
+    layouts = mm.matching_layouts(small_qc, backend)[:20]
+    for cost, log_cost in [
+        (default_cost, default_log_cost),
+        (decoherence_cost, decoherence_log_cost),
+    ]:
+        errors = [item[1] for item in cost(small_qc, layouts, backend)]
+        log_costs = [item[1] for item in log_cost(small_qc, layouts, backend)]
+        assert np.allclose(log_costs, -np.log1p(-np.array(errors)))
+
+
+def test_deep_circuit_ranking():
+    """Log cost ranks deep circuits whose error saturates"""
+    backend = FakeMontrealV2()
+    small_qc = build_circuit(backend)
+    small_qc.remove_final_measurements()
+    deep_qc = QuantumCircuit(small_qc.num_qubits)
+    for _ in range(2000):
+        deep_qc.compose(small_qc, inplace=True)
+    layouts = mm.matching_layouts(small_qc, backend)
+    errors = [item[1] for item in default_cost(deep_qc, layouts, backend)]
+    assert np.all(np.array(errors) == 1)
+
+    res = mm.evaluate_layouts(deep_qc, layouts, backend, cost_function=default_log_cost)
+    shallow = default_log_cost(small_qc, layouts, backend)
+    expected = sorted(shallow, key=lambda x: x[1])
+    assert [item[0] for item in res] == [item[0] for item in expected]
+    assert np.allclose([item[1] for item in res], [2000 * item[1] for item in expected])
+
+
+def test_neg_log_fidelity_metric():
+    """Metric and parallel scores match the log cost"""
+    backend = FakeMontrealV2()
+    small_qc = build_circuit(backend)
+    layouts = mm.matching_layouts(small_qc, backend)
+    expected = default_log_cost(small_qc, layouts, backend)
+    _, values = mm.evaluate_metrics(
+        small_qc, layouts, backend, metrics=["neg_log_fidelity"]
+    )
+    assert np.allclose(values[:, 0], [item[1] for item in expected])
+
+    res = mm.parallel_evaluate_layouts(
+        small_qc, layouts, backend, processes=1, log_cost=True
+    )
+    lookup = {tuple(layout): cost for layout, cost in expected}
+    assert np.allclose(
+        [cost for _, cost in res], [lookup[tuple(lay)] for lay, _ in res]
+    )
@@ -0,0 +1,101 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test multi-metric layout evaluation"""
+
+import numpy as np
+import pytest
+from qiskit import transpile
+from qiskit_ibm_runtime.fake_provider import FakeMontrealV2
+
+import mapomatic as mm
+from mapomatic.tests import ghz_circuit
+
+
+def custom_cost(circ, layouts, backend, gates):
+    """Error from the given gates alone"""
+    props = backend.properties()
+    out = []
+    for layout in layouts:
+        fid = 1
+        for item in circ._data:
+            qubits = [layout[circ.find_bit(qubit).index] for qubit in item[1]]
+            if item[0].name in gates and item[0].name == "measure":
+                fid *= 1 - props.readout_error(qubits[0])
+            elif item[0].name in gates:
+                fid *= 1 - props.gate_error(item[0].name, qubits)
+        out.append((layout, 1 - fid))
+    return out
+
+
+def test_metrics_match_cost_functions():
+    """Metric columns match the equivalent cost functions and schedules"""
+    backend = FakeMontrealV2()
+    small_qc = ghz_circuit(5, backend)
+    layouts = mm.matching_layouts(small_qc, backend)
+    out_layouts, values = mm.evaluate_metrics(small_qc, layouts, backend)
+    assert out_layouts == layouts
+    assert values.shape == (len(layouts), 4)
+    expected = [
+        mm.evaluate_layouts(small_qc, layouts, backend),
+        mm.evaluate_layouts(
+            small_qc,
+            layouts,
+            backend,
+            cost_function=lambda *args: custom_cost(*args, gates=["cx"]),
+        ),
+        mm.evaluate_layouts(
+            small_qc,
+            layouts,
+            backend,
+            cost_function=lambda *args: custom_cost(*args, gates=["measure"]),
+        ),
+    ]
+    for col, scores in enumerate(expected):
+        errors = dict((tuple(layout), error) for layout, error in scores)
+        assert np.allclose(
+            values[:, col], [errors[tuple(layout)] for layout in layouts], rtol=1e-12
+        )
+    dt = backend.configuration().dt
+    for row in [0, len(layouts) - 1]:
+        scheduled = transpile(
+            small_qc,
+            backend,
+            initial_layout=layouts[row],
+            scheduling_method="asap",
+            optimization_level=0,
+        )
+        assert values[row, 3] == pytest.approx(scheduled.duration * dt)
+
+
+def test_pareto_set():
+    """Pareto-optimal layouts are the layouts no other layout dominates"""
+    backend = FakeMontrealV2()
+    small_qc = ghz_circuit(5, backend)
+    layouts = mm.matching_layouts(small_qc, backend)
+    metrics = ("error_2q", "readout_error", "duration")
+    _, values = mm.evaluate_metrics(small_qc, layouts, backend, metrics=metrics)
+    front, front_values = mm.evaluate_metrics(
+        small_qc, layouts, backend, metrics=metrics, pareto=True
+    )
+    assert 1 < len(front) < len(layouts)
+    assert np.all(np.diff(front_values[:, 0]) >= 0)
+    for layout, row in zip(layouts, values):
+        dominated = np.any(np.all(values <= row, axis=1) & np.any(values < row, axis=1))
+        assert dominated == (layout not in front)
+
+
+def test_unknown_metric():
+    """Unknown metric names raise"""
+    backend = FakeMontrealV2()
+    small_qc = ghz_circuit(5, backend)
+    with pytest.raises(ValueError):
+        mm.evaluate_metrics(small_qc, [[0, 1, 2, 3, 5]], backend, metrics=["speed"])
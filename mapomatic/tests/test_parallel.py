@@ -0,0 +1,96 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test shared memory parallel scoring"""
+
+import numpy as np
+import pytest
+from qiskit import QuantumCircuit
+from qiskit_ibm_runtime.fake_provider import FakeMontrealV2
+
+import mapomatic as mm
+from mapomatic.layouts import default_log_cost
+from mapomatic.scoring import CircuitCounts, ErrorTables, log_fidelities
+from mapomatic.tests import ghz_circuit, product_cost
+
+
+def test_log_fidelities_match_product():
+    """Vectorized log-fidelities give the product of gate fidelities"""
+    backend = FakeMontrealV2()
+    small_qc = ghz_circuit(5, backend)
+    layouts = mm.matching_layouts(small_qc, backend)
+    expected = [error for _, error in product_cost(small_qc, layouts, backend)]
+    log_fids = log_fidelities(
+        CircuitCounts(small_qc), ErrorTables.from_backend(backend), np.array(layouts)
+    )
+    assert np.allclose(-np.expm1(log_fids), expected, rtol=1e-12, atol=0)
+
+
+def test_parallel_evaluate_layouts():
+    """Parallel scoring matches evaluate_layouts for all and top-k layouts"""
+    backend = FakeMontrealV2()
+    small_qc = ghz_circuit(5, backend)
+    layouts = mm.matching_layouts(small_qc, backend)
+    expected = mm.evaluate_layouts(small_qc, layouts, backend)
+    errors = {tuple(layout): error for layout, error in expected}
+    for processes in [1, 2]:
+        for top_k in [None, 3]:
+            out = mm.parallel_evaluate_layouts(
+                small_qc,
+                layouts,
+                backend,
+                top_k=top_k,
+                processes=processes,
+                chunk_size=5,
+            )
+            num = top_k or len(expected)
+            assert len(out) == num
+            # Layouts with equal errors up to rounding may swap places
+            assert np.allclose(
+                [item[1] for item in out],
+                [errors[tuple(item[0])] for item in out],
+                rtol=1e-12,
+                atol=0,
+            )
+            assert np.allclose(
+                [item[1] for item in out],
+                [item[1] for item in expected[:num]],
+                rtol=1e-12,
+                atol=0,
+            )
+
+
+def test_parallel_ties_in_layout_order():
+    """Tied layouts keep their order, as with evaluate_layouts"""
+    backend = FakeMontrealV2()
+    props = backend.properties()
+    # Only the first qubit is measured, so layouts tie on its readout error
+    small_qc = QuantumCircuit(2, 1)
+    small_qc.measure(0, 0)
+    good, bad = sorted(range(11, 27), key=props.readout_error)[:2]
+    layouts = [[good, 1]] + [[bad, qubit] for qubit in range(2, 10)] + [[good, 10]]
+    expected = sorted(
+        default_log_cost(small_qc, layouts, backend), key=lambda item: item[1]
+    )
+    out = mm.parallel_evaluate_layouts(
+        small_qc, layouts, backend, top_k=3, processes=1, chunk_size=10, log_cost=True
+    )
+    assert out == expected[:3]
+
+
+def test_parallel_missing_calibration():
+    """Layouts on gates without calibration data raise"""
+    backend = FakeMontrealV2()
+    small_qc = ghz_circuit(5, backend)
+    with pytest.raises(ValueError):
+        mm.parallel_evaluate_layouts(
+            small_qc, [[0, 5, 10, 15, 20]], backend, processes=1
+        )
@@ -0,0 +1,130 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test pruning backends by a bound on the cost"""
+
+import math
+
+import numpy as np
+from qiskit_ibm_runtime.fake_provider import (
+    FakeAthensV2,
+    FakeBelemV2,
+    FakeBogotaV2,
+    FakeGuadalupeV2,
+    FakeLimaV2,
+    FakeManilaV2,
+    FakeMontrealV2,
+    FakeQuitoV2,
+    FakeSantiagoV2,
+)
+
+import mapomatic as mm
+from mapomatic.layouts import decoherence_cost, default_log_cost
+from mapomatic.scoring import CircuitCounts, ErrorTables, log_fidelity_bound
+from mapomatic.tests import ghz_circuit
+
+
+class CountingBackend:
+    """Backend counting the calibration data fetches"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+        self.fetches = 0
+
+    def configuration(self):
+        """Configuration of the backend"""
+        return self.backend.configuration()
+
+    def properties(self):
+        """Calibration data of the backend"""
+        self.fetches += 1
+        return self.backend.properties()
+
+
+def fleet():
+    """Backends with a CX basis"""
+    return [
+        FakeQuitoV2(),
+        FakeMontrealV2(),
+        FakeBelemV2(),
+        FakeAthensV2(),
+        FakeGuadalupeV2(),
+        FakeLimaV2(),
+        FakeBogotaV2(),
+        FakeManilaV2(),
+        FakeSantiagoV2(),
+    ]
+
+
+def test_bound_below_costs():
+    """The bound is at most the cost of every layout"""
+    small_qc = ghz_circuit(4, FakeLimaV2())
+    counts = CircuitCounts(small_qc)
+    for backend in fleet():
+        bound = -math.expm1(
+            log_fidelity_bound(counts, ErrorTables.from_backend(backend))
+        )
+        layouts = mm.matching_layouts(small_qc, backend)
+        costs = [cost for _, cost in mm.evaluate_layouts(small_qc, layouts, backend)]
+        assert bound <= min(costs)
+
+
+def test_pruned_result_unchanged():
+    """Pruning gives the same best layout and skips some backends"""
+    small_qc = ghz_circuit(4, FakeLimaV2())
+    backends = fleet()
+    for cost_function in [None, decoherence_cost, default_log_cost]:
+        expected = mm.best_overall_layout(
+            small_qc, backends, cost_function=cost_function, prune=False
+        )
+        with mm.LayoutStats() as stats:
+            res = mm.best_overall_layout(
+                small_qc, backends, cost_function=cost_function
+            )
+        assert res == expected
+        pruned = [
+            name for name, counters in stats.counters.items() if counters.get("pruned")
+        ]
+        assert pruned
+        for name in pruned:
+            assert "vf2_calls" not in stats.counters[name]
+            assert expected[1] != name
+
+
+def test_pruned_single_fetch():
+    """The bound and the search share one calibration data fetch"""
+    small_qc = ghz_circuit(4, FakeLimaV2())
+    for prune in [False, True]:
+        backends = [CountingBackend(backend) for backend in fleet()]
+        mm.best_overall_layout(small_qc, backends, prune=prune)
+        assert max(backend.fetches for backend in backends) == 1
+
+
+def test_successors_not_pruned():
+    """All backends are searched for successors"""
+    small_qc = ghz_circuit(4, FakeLimaV2())
+    backends = fleet()
+    res = mm.best_overall_layout(small_qc, backends, successors=True)
+    assert len(res) == len(backends)
+    assert res[0] == mm.best_overall_layout(small_qc, backends)
+
+
+def test_service_pruned_result_unchanged():
+    """Service queries give the same best layout with pruning"""
+    small_qc = ghz_circuit(4, FakeLimaV2())
+    backends = fleet()
+    with mm.LayoutService(backends) as service:
+        res = service.best_layout(small_qc)
+        expected = service.best_layout(small_qc, successors=True)[0]
+    assert res[0] == expected[0]
+    assert res[1] == expected[1]
+    assert np.allclose(res[2], expected[2])
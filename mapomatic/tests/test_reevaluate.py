@@ -0,0 +1,69 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test incremental re-evaluation of layouts"""
+
+import copy
+
+import numpy as np
+from qiskit_ibm_runtime.fake_provider import FakeMontrealV2
+
+import mapomatic as mm
+from mapomatic.layouts import calibration_table, calibration_changes
+from mapomatic.tests import ghz_circuit
+
+
+def recalibrate(backend, qubit, readout_error):
+    """Return a copy of a fake backend with a new readout error on a qubit"""
+    new_backend = copy.deepcopy(backend)
+    for param in new_backend._props_dict["qubits"][qubit]:
+        if param["name"] == "readout_error":
+            param["value"] = readout_error
+    return new_backend
+
+
+def test_reevaluate_matches_full_evaluation():
+    """Re-evaluated scores match a full evaluation with the new calibration"""
+    backend = FakeMontrealV2()
+    small_qc = ghz_circuit(4, backend, star=True)
+    layouts = mm.matching_layouts(small_qc, backend)
+    scores = mm.evaluate_layouts(small_qc, layouts, backend)
+    old_table = calibration_table(backend)
+
+    # Make the current best layout much worse
+    new_backend = recalibrate(backend, scores[0][0][0], 0.5)
+    calls = []
+
+    def counting_cost(circ, layouts, backend):
+        calls.append(len(layouts))
+        return mm.layouts.default_cost(circ, layouts, backend)
+
+    res = mm.reevaluate_layouts(
+        small_qc, scores, new_backend, old_table, cost_function=counting_cost
+    )
+    expected = mm.evaluate_layouts(small_qc, layouts, new_backend)
+    assert len(calls) == 1
+    assert 0 < calls[0] < len(layouts)
+    assert len(res) == len(expected)
+    assert res[0][0] != scores[0][0]
+    expected = {tuple(layout): cost for layout, cost in expected}
+    for layout, cost in res:
+        assert np.allclose(cost, expected[tuple(layout)])
+
+
+def test_calibration_changes_tolerance():
+    """Changes within tolerance are ignored"""
+    backend = FakeMontrealV2()
+    old_table = calibration_table(backend)
+    value = old_table[("qubit", (5,), "readout_error")]
+    new_table = calibration_table(recalibrate(backend, 5, value * 1.001))
+    assert calibration_changes(old_table, new_table) == ({5}, set())
+    assert calibration_changes(old_table, new_table, rtol=0.01) == (set(), set())
@@ -0,0 +1,104 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test the layout service"""
+
+from qiskit_ibm_runtime.fake_provider import FakeBelemV2, FakeQuitoV2, FakeLimaV2
+
+import mapomatic as mm
+from mapomatic.scoring import ErrorTables
+from mapomatic.service import PreparedBackend, best_prepared_layout
+from mapomatic.tests import ghz_circuit
+
+
+def test_service_matches_best_overall_layout():
+    """Service queries match best_overall_layout"""
+    small_qc = ghz_circuit(3, FakeBelemV2(), star=True)
+    backends = [FakeBelemV2(), FakeQuitoV2(), FakeLimaV2()]
+    expected = mm.best_overall_layout(small_qc, backends, successors=True)
+    with mm.LayoutService(backends, max_workers=2) as service:
+        assert service.backends == ["fake_belem", "fake_quito", "fake_lima"]
+        futures = [service.submit(small_qc, successors=True) for _ in range(5)]
+        for future in futures:
+            assert future.result() == expected
+        assert service.best_layout(small_qc) == expected[0]
+        percentiles = service.latency_percentiles()
+    assert list(percentiles) == [50, 90, 99]
+    assert 0 < percentiles[50] <= percentiles[99]
+
+
+def test_best_prepared_layout():
+    """Queries on prepared backends match best_overall_layout"""
+    small_qc = ghz_circuit(3, FakeBelemV2(), star=True)
+    backends = [FakeBelemV2(), FakeQuitoV2(), FakeLimaV2()]
+    prepared = [PreparedBackend(backend) for backend in backends]
+    expected = mm.best_overall_layout(small_qc, backends, successors=True)
+    assert best_prepared_layout(small_qc, prepared, successors=True) == expected
+    assert best_prepared_layout(small_qc, prepared) == expected[0]
+
+
+def test_service_reuses_error_tables(monkeypatch):
+    """Error tables are built when backends are prepared, not per query"""
+    small_qc = ghz_circuit(3, FakeBelemV2(), star=True)
+    backends = [FakeBelemV2(), FakeQuitoV2(), FakeLimaV2()]
+    built = []
+    from_backend = ErrorTables.from_backend
+
+    def counting(_, backend, props=None):
+        built.append(backend)
+        return from_backend(backend, props=props)
+
+    monkeypatch.setattr(ErrorTables, "from_backend", classmethod(counting))
+    with mm.LayoutService(backends) as service:
+        assert len(built) == 3
+        for _ in range(5):
+            service.best_layout(small_qc)
+            service.best_layout(small_qc, successors=True)
+    assert len(built) == 3
+
+
+def test_service_refresh():
+    """Only backends with changed calibrations are re-prepared"""
+    small_qc = ghz_circuit(3, FakeBelemV2(), star=True)
+    backends = [FakeBelemV2(), FakeLimaV2()]
+    with mm.LayoutService(backends) as service:
+        assert service.refresh() == []
+        best = service.best_layout(small_qc)
+        # Make the readout on the best qubits of the best backend awful
+        backend = backends[[item.name for item in backends].index(best[1])]
+        for qubit in best[0]:
+            for param in backend._props_dict["qubits"][qubit]:
+                if param["name"] == "readout_error":
+                    param["value"] = 0.5
+        assert service.refresh() == [best[1]]
+        assert service.best_layout(small_qc) == mm.best_overall_layout(
+            small_qc, backends
+        )
+
+
+def test_service_processes():
+    """Queries can run in a process pool"""
+    small_qc = ghz_circuit(3, FakeBelemV2(), star=True)
+    backends = [FakeBelemV2(), FakeLimaV2()]
+    expected = mm.best_overall_layout(small_qc, backends, successors=True)
+    with mm.LayoutService(backends, max_workers=1, processes=True) as service:
+        assert service.best_layout(small_qc, successors=True) == expected
+
+
+def test_service_atlases():
+    """Services with atlases give the same layouts"""
+    small_qc = ghz_circuit(3, FakeBelemV2(), star=True)
+    backends = [FakeBelemV2(), FakeQuitoV2(), FakeLimaV2()]
+    expected = mm.best_overall_layout(small_qc, backends, successors=True)
+    with mm.LayoutService(backends, atlases=True) as service:
+        with mm.LayoutStats() as stats:
+            assert service.best_layout(small_qc, successors=True) == expected
+    assert stats.counters["fake_belem"]["atlas_hits"] == 1
@@ -0,0 +1,59 @@
+# This code is part of Mapomatic.
+#
+# (C) Copyright IBM 2022.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+"""Test layout instrumentation"""
+
+from qiskit_ibm_runtime.fake_provider import FakeMontrealV2, FakeBelemV2
+
+import mapomatic as mm
+from mapomatic.stats import current_stats
+from mapomatic.tests import ghz_circuit
+
+
+def test_stats_per_backend():
+    """Stages and counters are recorded per backend"""
+    qc = ghz_circuit(4, FakeMontrealV2(), star=True)
+    calls = []
+    with mm.LayoutStats(callback=lambda *args: calls.append(args)) as stats:
+        res = mm.best_overall_layout(
+            qc, [FakeMontrealV2(), FakeBelemV2()], successors=True
+        )
+    assert not current_stats().enabled
+    assert set(stats.timings) == {"fake_montreal", "fake_belem"}
+    for stage in ["configuration", "gate_check", "vf2", "properties", "scoring"]:
+        assert stage in stats.timings["fake_montreal"]
+    montreal = stats.counters["fake_montreal"]
+    assert montreal["vf2_calls"] == 1
+    assert montreal["layouts_found"] == montreal["layouts_scored"] == 48
+    assert montreal["layouts_unique"] == 8
+    assert not montreal["call_limit_hit"]
+    assert len(res) == 2
+    assert ("fake_belem", "vf2", stats.timings["fake_belem"]["vf2"]) in calls
+
+
+def test_stats_call_limit_hit():
+    """Hitting the VF2 call limit is reported"""
+    qc = ghz_circuit(4, FakeMontrealV2(), star=True)
+    backend = FakeMontrealV2()
+    with mm.LayoutStats() as stats:
+        layouts = mm.matching_layouts(qc, backend, call_limit=20)
+    assert stats.counters[None]["call_limit_hit"]
+    assert stats.counters[None]["vf2_states"] > 20
+    assert stats.counters[None]["layouts_found"] == len(layouts)
+
+
+def test_stats_disabled_results_unchanged():
+    """Instrumentation does not change the results"""
+    qc = ghz_circuit(4, FakeMontrealV2(), star=True)
+    backend = FakeMontrealV2()
+    with mm.LayoutStats():
+        layouts = mm.matching_layouts(qc, backend)
+    assert layouts == mm.matching_layouts(qc, backend)
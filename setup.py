@@ -34,7 +34,7 @@ with open("requirements.txt") as f:
         if req:
             REQUIREMENTS.append(req)
 
-PACKAGES = setuptools.find_namespace_packages()
+PACKAGES = setuptools.find_namespace_packages(include=["mapomatic", "mapomatic.*"])
 PACKAGE_DATA = {
 }
 
@@ -158,6 +158,7 @@ setuptools.setup(
         "Topic :: Scientific/Engineering",
     ],
     cmdclass={'lint': PylintCommand, 'style': StyleCommand},
+    entry_points={'console_scripts': ['mapomatic = mapomatic.cli:main']},
     install_requires=REQUIREMENTS,
     package_data=PACKAGE_DATA,
     include_package_data=True,